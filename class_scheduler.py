@@ -32,54 +32,117 @@ class Scheduler():
             total_fatigue += daily_fatigue
         return total_fatigue
 
-    def is_time_slot_available(self, day, start_time, duration, available_hours):
-        return all(hour in available_hours[day] for hour in range(start_time, start_time + duration))
+    def is_time_slot_available(self, day, start_time, duration, day_masks):
+        # day_masks[day] 的第 i 位代表 self.start_time + i 點已被占用
+        if duration <= 0:
+            return True
+        if start_time < self.start_time or start_time + duration > self.end_time:
+            return False
+        return not day_masks[day] & (((1 << duration) - 1) << (start_time - self.start_time))
 
-    def assign_task(self, task, schedule, available_hours):
+    def assign_task(self, task, schedule, day_masks):
         assignments = []
         if task["fixed_time"]:
             day, start_time = task["fixed_time"]
             duration = int(task["time"])
-            if self.is_time_slot_available(day, start_time, duration, available_hours):
+            if self.is_time_slot_available(day, start_time, duration, day_masks):
                 assignments.append((day, start_time))
         else:
             duration = int(task["time"])
+            run = (1 << duration) - 1 if duration > 0 else 0
             for day in self.days:
+                mask = day_masks[day]
                 for start_time in range(self.start_time, self.end_time - duration + 1):
-                    if self.is_time_slot_available(day, start_time, duration, available_hours):
+                    if not mask & (run << (start_time - self.start_time)):
                         assignments.append((day, start_time))
         return assignments
 
-    def backtrack(self, tasks, schedule, available_hours):
-        if not tasks:
-            fatigue = self.calculate_fatigue(schedule)
-            if fatigue < self.min_fatigue:
-                self.min_fatigue = fatigue
-                self.best_schedule = copy.deepcopy(schedule)
+    def place_last_task(self, schedule, day_masks, total_fatigue):
+        # 最後一個任務直接比較每個位置，不用再推一層
+        index = len(self.tasks) - 1
+        task = self.tasks[index]
+        difficulty, spent_time = self.task_values[index]
+        for day, start_time in self.assign_task(task, schedule, day_masks):
+            fatigue_sum = self.day_fatigue.get(day, 0)
+            difficulty_sum = self.day_difficulty.get(day, 0)
+            new_fatigue_sum = fatigue_sum + difficulty * spent_time
+            new_difficulty_sum = difficulty_sum + difficulty
+            next_total = total_fatigue - fatigue_sum * (1 + difficulty_sum) + new_fatigue_sum * (1 + new_difficulty_sum)
+            if next_total < self.min_fatigue:
+                self.min_fatigue = next_total
+                schedule.setdefault(day, []).append((start_time, task["name"]))
+                self.best_schedule = {day: list(entries) for day, entries in schedule.items()}
+                schedule[day].pop()
+
+    def backtrack(self, index, schedule, day_masks, total_fatigue):
+        if index == len(self.tasks):
+            if total_fatigue < self.min_fatigue:
+                self.min_fatigue = total_fatigue
+                self.best_schedule = {day: list(entries) for day, entries in schedule.items()}
+            return
+        if index + 1 == len(self.tasks):
+            self.place_last_task(schedule, day_masks, total_fatigue)
             return
 
-        task = tasks[0]
-        possible_assignments = self.assign_task(task, schedule, available_hours)
-        for day, start_time in possible_assignments:
+        # 用明確的堆疊取代遞迴，任務再多也不會超過 Python 的遞迴上限
+        # 每個 frame: [index, total_fatigue, possible_assignments, 下一個要試的位置, 目前套用的 assignment]
+        tasks, day_fatigue, day_difficulty = self.tasks, self.day_fatigue, self.day_difficulty
+        stack = [[index, total_fatigue, self.assign_task(tasks[index], schedule, day_masks), 0, None]]
+        while stack:
+            frame = stack[-1]
+            index, total_fatigue, possible_assignments, position, undo = frame
+            if undo is not None:
+                # Backtrack
+                day, occupied, fatigue_sum, difficulty_sum = undo
+                schedule[day].pop()
+                if occupied:
+                    day_masks[day] ^= occupied
+                day_fatigue[day] = fatigue_sum
+                day_difficulty[day] = difficulty_sum
+                frame[4] = None
+            if position == len(possible_assignments):
+                stack.pop()
+                continue
+            frame[3] = position + 1
+
+            task = tasks[index]
+            day, start_time = possible_assignments[position]
+            difficulty, spent_time = self.task_values[index]
             duration = int(task["time"])
+            # 與 calculate_fatigue 相同：每天 (疲勞值總和) * (1 + 難度總和)，只更新這一天
+            fatigue_sum = day_fatigue.get(day, 0)
+            difficulty_sum = day_difficulty.get(day, 0)
+            new_fatigue_sum = fatigue_sum + difficulty * spent_time
+            new_difficulty_sum = difficulty_sum + difficulty
+            next_total = total_fatigue - fatigue_sum * (1 + difficulty_sum) + new_fatigue_sum * (1 + new_difficulty_sum)
+            occupied = ((1 << duration) - 1) << (start_time - self.start_time) if duration > 0 else 0
             # Assign task
             schedule.setdefault(day, []).append((start_time, task["name"]))
-            # Update available hours
-            for hour in range(start_time, start_time + duration):
-                available_hours[day].remove(hour)
-            # Recurse
-            self.backtrack(tasks[1:], schedule, available_hours)
-            # Backtrack
-            schedule[day].remove((start_time, task["name"]))
-            for hour in range(start_time, start_time + duration):
-                available_hours[day].append(hour)
-                available_hours[day].sort()  # Keep hours sorted
+            if occupied:
+                day_masks[day] |= occupied
+            day_fatigue[day] = new_fatigue_sum
+            day_difficulty[day] = new_difficulty_sum
+            frame[4] = (day, occupied, fatigue_sum, difficulty_sum)
+            if index + 2 == len(tasks):
+                self.place_last_task(schedule, day_masks, next_total)
+            else:
+                stack.append([index + 1, next_total, self.assign_task(tasks[index + 1], schedule, day_masks), 0, None])
 
     def minimize_total_fatigue(self):
         self.best_schedule = None
         self.min_fatigue = float('inf')
-        available_hours = {day: list(range(self.start_time, self.end_time)) for day in self.days}
-        self.backtrack(self.tasks, {}, available_hours)
+        # 與 calculate_fatigue 一樣依名稱從 all_tasks 查每個任務的 (難度, 時間)
+        task_mapping = {task['name']: task for task in self.all_tasks}
+        self.task_values = [(task_mapping[task["name"]]["difficulty"], task_mapping[task["name"]]["time"])
+                            for task in self.tasks]
+        # 每天已排任務的疲勞值總和與難度總和，每個節點只更新一天
+        self.day_fatigue = {}
+        self.day_difficulty = {}
+        day_masks = {day: 0 for day in self.days}
+        self.backtrack(0, {}, day_masks, 0)
+        if self.best_schedule is not None:
+            # 搜尋中的總和是逐步更新的，最後用 calculate_fatigue 重算一次
+            self.min_fatigue = self.calculate_fatigue(self.best_schedule)
         # Generate schedule dataframe
         schedule_df = self.generate_schedule_dataframe(schedule=self.best_schedule)
         return schedule_df, self.min_fatigue
@@ -0,0 +1,142 @@
+# free_intervals.py
+from bisect import bisect_left, bisect_right, insort
+
+
+class FreeIntervalIndex:
+    """
+    Free time slots of one day as maximal intervals (start_slot, length).
+
+    Intervals are kept sorted by start (to find the interval containing a slot) and by (length, start)
+    (for best-fit / worst-fit), plus a max segment tree over start slots for first-fit, so every lookup
+    is a logarithmic search. Allocating splits an interval, releasing merges it with its neighbours.
+    """
+
+    def __init__(self, num_slots):
+        """
+        :param num_slots: Number of time slots in the day, all free at first.
+        """
+        self.num_slots = num_slots
+        self.size = 1 << max(num_slots - 1, 0).bit_length()
+        self.tree = [0] * (2 * self.size)  # tree[size + s] = length of the free interval starting at s
+        self.starts = []
+        self.length_at = {}
+        self.by_length = []
+        if num_slots > 0:
+            self.insert_interval(0, num_slots)
+
+    def insert_interval(self, start_slot, length):
+        insort(self.starts, start_slot)
+        self.length_at[start_slot] = length
+        insort(self.by_length, (length, start_slot))
+        self.set_leaf(start_slot, length)
+
+    def remove_interval(self, start_slot):
+        length = self.length_at.pop(start_slot)
+        del self.starts[bisect_left(self.starts, start_slot)]
+        del self.by_length[bisect_left(self.by_length, (length, start_slot))]
+        self.set_leaf(start_slot, 0)
+        return length
+
+    def set_leaf(self, start_slot, length):
+        node = self.size + start_slot
+        self.tree[node] = length
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def intervals(self):
+        """
+        Free intervals as (start_slot, length), in slot order.
+        """
+        return [(start_slot, self.length_at[start_slot]) for start_slot in self.starts]
+
+    def largest(self):
+        """
+        Length of the longest free interval (0 if the day is full).
+        """
+        return self.tree[1]
+
+    def containing(self, slot):
+        """
+        Start of the free interval containing slot, or None if the slot is taken.
+        """
+        index = bisect_right(self.starts, slot) - 1
+        if index >= 0 and slot < self.starts[index] + self.length_at[self.starts[index]]:
+            return self.starts[index]
+        return None
+
+    def is_free(self, start_slot, num_slots):
+        """
+        Check whether slots start_slot .. start_slot + num_slots - 1 are all free.
+        """
+        if num_slots <= 0:
+            return True
+        interval_start = self.containing(start_slot)
+        return interval_start is not None and \
+            start_slot + num_slots <= interval_start + self.length_at[interval_start]
+
+    def first_fit(self, num_slots):
+        """
+        Lowest start slot of a free run of num_slots slots, or None.
+        """
+        if num_slots <= 0:
+            return 0
+        if self.tree[1] < num_slots:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] >= num_slots else 2 * node + 1
+        return node - self.size
+
+    def best_fit(self, num_slots):
+        """
+        Start of the shortest free interval that still holds num_slots slots (lowest start on ties), or None.
+        """
+        if num_slots <= 0:
+            return 0
+        index = bisect_left(self.by_length, (num_slots, -1))
+        return self.by_length[index][1] if index < len(self.by_length) else None
+
+    def worst_fit(self, num_slots):
+        """
+        Start of the longest free interval (lowest start on ties), or None if it cannot hold num_slots slots.
+        """
+        if num_slots <= 0:
+            return 0
+        if self.tree[1] < num_slots:
+            return None
+        return self.by_length[bisect_left(self.by_length, (self.tree[1], -1))][1]
+
+    def allocate(self, start_slot, num_slots):
+        """
+        Mark slots start_slot .. start_slot + num_slots - 1 as taken, splitting their free interval.
+        """
+        if num_slots <= 0:
+            return
+        if not self.is_free(start_slot, num_slots):
+            raise ValueError("時段已被占用。")
+        interval_start = self.containing(start_slot)
+        interval_end = interval_start + self.remove_interval(interval_start)
+        if start_slot > interval_start:
+            self.insert_interval(interval_start, start_slot - interval_start)
+        if start_slot + num_slots < interval_end:
+            self.insert_interval(start_slot + num_slots, interval_end - start_slot - num_slots)
+
+    def release(self, start_slot, num_slots):
+        """
+        Mark taken slots start_slot .. start_slot + num_slots - 1 as free again, merging adjacent intervals.
+        """
+        if num_slots <= 0:
+            return
+        new_start, new_end = start_slot, start_slot + num_slots
+        index = bisect_left(self.starts, start_slot)
+        if self.containing(start_slot) is not None or (index < len(self.starts) and self.starts[index] < new_end):
+            raise ValueError("時段本來就是空閒的。")
+        index -= 1
+        if index >= 0 and self.starts[index] + self.length_at[self.starts[index]] == start_slot:
+            new_start = self.starts[index]
+            self.remove_interval(new_start)
+        if new_end in self.length_at:
+            new_end += self.remove_interval(new_end)
+        self.insert_interval(new_start, new_end - new_start)
@@ -2,7 +2,7 @@
 import time
 import pandas as pd
 from tabulate import tabulate
-from collections import defaultdict
+from collections import defaultdict, deque
 
 type_check_dictionary={"int": int, "float": float, "str": str, "bool": bool}
 def type_checker(value):
@@ -252,19 +252,37 @@ class Scheduler(TaskSet):
 
     def resolve_dependencies(self):
         """
-        根據依賴關係排序任務。
+        根據依賴關係排序任務（Kahn 拓撲排序，O(任務數 + 依賴數)）。
+        前置任務排在依賴它的任務前面；找不到前置任務或依賴關係有循環時拋出 ValueError。
         """
+        names = {task["name"] for task in self.tasks}
+        waiting = []  # 每個任務還沒排好的前置任務數
+        dependents = defaultdict(list)  # 任務名稱 -> 依賴它的任務位置
+        for index, task in enumerate(self.tasks):
+            dependencies = set(task["dependencies"])
+            for dep in dependencies:
+                if dep not in names:
+                    raise ValueError(f"找不到前置任務: {dep}")
+                dependents[dep].append(index)
+            waiting.append(len(dependencies))
+
         sorted_tasks = []
         resolved = set()  # 已排序的任務名稱
-
-        while self.tasks:
-            for task in self.tasks:
-                dependencies = task["dependencies"]
-                if not dependencies or all(dep in resolved for dep in dependencies):
-                    sorted_tasks.append(task)
-                    resolved.add(task["name"])
-                    self.tasks.remove(task)
-                    break
+        ready = deque(index for index, count in enumerate(waiting) if not count)
+        while ready:
+            task = self.tasks[ready.popleft()]
+            sorted_tasks.append(task)
+            if task["name"] in resolved:
+                continue
+            resolved.add(task["name"])
+            for index in dependents[task["name"]]:
+                waiting[index] -= 1
+                if not waiting[index]:
+                    ready.append(index)
+
+        if len(sorted_tasks) < len(self.tasks):
+            cycle = [task["name"] for index, task in enumerate(self.tasks) if waiting[index]]
+            raise ValueError(f"任務的依賴關係有循環: {', '.join(cycle)}")
         self.tasks = sorted_tasks
 
     def assign_general_tasks(self):
@@ -277,6 +295,8 @@ class Scheduler(TaskSet):
         for task in self.tasks:
             duration = int(task["time"])
             for day, hours in self.available_hours.items():
+                if not hours:
+                    continue  # 當天已經排滿
                 # 嘗試找到連續的空閒時段
                 for i in range(len(hours) - duration + 1):
                     if hours[i:i + duration] == list(range(hours[i], hours[i] + duration)):
@@ -452,38 +472,233 @@ class optimize(Scheduler):
         # return self.best_schedule_df, self.min_fatigue
     def minimize_total_fatigue(self):
         """
-        遍歷任務排列組合，找到疲勞值最小的最佳行程表。
+        找到疲勞值最小的最佳行程表，結果與遍歷所有任務排列組合相同，但不用真的遍歷 n! 種排列。
+
+        排列只在兩個地方影響結果：
+        - 固定任務互相衝突時誰先占到時段：每天最後放進行程表的固定任務，一定是互不衝突、
+          而且其他固定任務都和其中某個衝突的一組，每一組都有排列做得到（沒放進去的排在最後）
+        - 同一天固定任務的加入順序：每加入一個任務，前面累積的疲勞值都會再乘一次平均難度的係數，
+          係數只和已經加入哪些任務有關，所以用子集動態規劃找最好的順序
+        一般任務照 (難度, 時間) 排序，排序同分的任務難度和時間都一樣，先後不影響疲勞值。
+        所以只要逐天選擇固定任務占用的時段（占用時段相同的組合只搜尋一次），下界不小於目前最佳解時剪枝。
         """
-        import itertools
-
         if not self.tasks:
             return None, 0  # 沒有任務時直接返回
 
-        all_combinations = itertools.permutations(self.tasks)
+        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        day_index = {day: index for index, day in enumerate(days)}
+        fixed_by_day = [[] for _ in days]
+        for task in self.tasks:
+            if task["fixed_time"]:
+                fixed_by_day[day_index[task["fixed_time"][0]]].append(task)
+
+        # 所有任務（包含固定任務）之後都會再照難度和時間排序分配一次
+        self.general_order = sorted(self.tasks, key=lambda x: (-x["difficulty"], -x["time"]))
+        self.use_bound = all(task["difficulty"] >= 0 and task["time"] >= 0 for task in self.tasks)
+        self.order_cache = {}
+        self.day_options = [self.fixed_task_options(tasks) for tasks in fixed_by_day]
+
+        # 每天每種占用時段的疲勞值下界：當天最多可能有 (固定任務數 + 所有任務數) 個任務，平均難度的係數最小
+        self.day_bounds = []
+        for options in self.day_options:
+            bounds = []
+            for mask, groups in options.items():
+                bound = 0
+                if self.use_bound:
+                    bound = min(self.order_fixed_tasks(group, len(group) + len(self.general_order))[0]
+                                for group in groups)
+                bounds.append((bound, mask))
+            self.day_bounds.append(sorted(bounds, key=lambda item: item[0]))
+
+        self.best_fixed_groups = None
+        self.best_schedule = None
+        self.min_fatigue = float('inf')
+        self.search_day_masks(0, [], sum(bounds[0][0] for bounds in self.day_bounds))
+
+        # 用找到的固定任務順序重新排一次，行程表和疲勞值與該排列下原本的算法完全相同
+        fixed_order = [task for group in self.best_fixed_groups for task in group]
+        placed = {id(task) for task in fixed_order}
+        self.tasks = fixed_order + [task for task in self.tasks if id(task) not in placed]
+        self.schedule = defaultdict(list)
+        self.available_hours = {day: list(range(9, 17)) for day in days}
+        self.assign_fixed_tasks()
+        self.assign_general_tasks()
+        self.min_fatigue = self.calculate_fatigue()
+        self.best_schedule = self.schedule.copy()
 
-        for combination in all_combinations:
-            # 重置行程表
-            self.schedule = defaultdict(list)
-            self.available_hours = {
-                day: list(range(9, 17)) for day in
-                ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            }
+        # 基於最佳結果生成行程表
+        best_schedule_df = self.generate_schedule_dataframe(schedule=self.best_schedule)
+        return best_schedule_df, self.min_fatigue
 
-            # 更新任務排序並分配
-            self.tasks = list(combination)
-            self.assign_fixed_tasks()
-            self.assign_general_tasks()
+    def fixed_task_options(self, tasks):
+        """
+        一天的固定任務最後可能放進行程表的組合，依占用時段分組。
+        :param tasks: 當天的固定任務 (list)
+        :return: {占用時段 mask (第 i 位代表 9 + i 點): [固定任務組合, ...]}
+        """
+        always = []  # 不到一小時的任務不占用時段，一定放得進去
+        candidates = []
+        for task in tasks:
+            start_time = task["fixed_time"][1]
+            duration = int(task["time"])
+            if duration <= 0:
+                always.append(task)
+            elif 9 <= start_time and start_time + duration <= 17:
+                candidates.append((((1 << duration) - 1) << (start_time - 9), task))
+            # 超出 9 ~ 17 點的任務永遠放不進去
+
+        options = {}
+        seen = set()
+        self.collect_fixed_groups(candidates, 0, 0, [], always, options, seen)
+        return options
+
+    def collect_fixed_groups(self, candidates, index, mask, chosen, always, options, seen):
+        """
+        列舉互不衝突、且沒選的任務都和已選的衝突的固定任務組合，相同的組合只記一次。
+        """
+        if index == len(candidates):
+            if all(need & mask for need, _ in candidates):
+                group = always + chosen
+                key = tuple(sorted((task["fixed_time"][1], task["difficulty"], task["time"]) for task in group))
+                if key not in seen:
+                    seen.add(key)
+                    options.setdefault(mask, []).append(group)
+            return
+        need, task = candidates[index]
+        if not need & mask:
+            chosen.append(task)
+            self.collect_fixed_groups(candidates, index + 1, mask | need, chosen, always, options, seen)
+            chosen.pop()
+        self.collect_fixed_groups(candidates, index + 1, mask, chosen, always, options, seen)
+
+    def search_day_masks(self, day, masks, lower_bound):
+        """
+        逐天選擇固定任務占用的時段，先試下界小的。
+        :param lower_bound: 目前選擇下總疲勞值的下界
+        """
+        if self.use_bound and lower_bound >= self.min_fatigue:
+            return
+        if day == 7:
+            self.evaluate_day_masks(masks)
+            return
+        for bound, mask in self.day_bounds[day]:
+            masks.append(mask)
+            self.search_day_masks(day + 1, masks, lower_bound - self.day_bounds[day][0][0] + bound)
+            masks.pop()
+
+    def evaluate_day_masks(self, masks):
+        """
+        依每天固定任務占用的時段分配一般任務，每天再選最好的固定任務組合和順序，更新最佳解。
+        """
+        general_entries = self.assign_general_hours(masks)
+        total_fatigue = 0
+        fixed_groups = []
+        for day, mask in enumerate(masks):
+            best_fatigue, best_order = float('inf'), None
+            for group in self.day_options[day][mask]:
+                task_count = len(group) + len(general_entries[day])
+                if not task_count:
+                    best_fatigue, best_order = 0, []
+                    continue
+                fixed_fatigue, order = self.order_fixed_tasks(group, task_count)
+                fatigue = self.day_fatigue(general_entries[day], task_count, fixed_fatigue,
+                                           sum(task["difficulty"] for task in group))
+                if fatigue < best_fatigue:
+                    best_fatigue, best_order = fatigue, order
+            total_fatigue += best_fatigue
+            fixed_groups.append(best_order)
+        if total_fatigue < self.min_fatigue:
+            self.min_fatigue = total_fatigue
+            self.best_fixed_groups = fixed_groups
+
+    def order_fixed_tasks(self, tasks, task_count):
+        """
+        同一天固定任務最好的加入順序（子集動態規劃）。
+        :param tasks: 當天放進行程表的固定任務 (list)
+        :param task_count: 當天最後的任務數
+        :return: (依此順序加入後的疲勞值, 任務順序)
+        """
+        key = (tuple(id(task) for task in tasks), task_count)
+        if key in self.order_cache:
+            return self.order_cache[key]
+
+        size = len(tasks)
+        values = [task["difficulty"] * task["time"] * self.time_factor(task["fixed_time"][1]) for task in tasks]
+        best = [0] + [float('inf')] * ((1 << size) - 1)
+        last = [None] * (1 << size)
+        difficulty_sum = [0] * (1 << size)
+        for subset in range(1, 1 << size):
+            lowest = subset & -subset
+            difficulty_sum[subset] = difficulty_sum[subset ^ lowest] + tasks[lowest.bit_length() - 1]["difficulty"]
+            factor = 1 + (difficulty_sum[subset] / task_count) ** 2
+            for i in range(size):
+                if subset >> i & 1:
+                    fatigue = (best[subset ^ (1 << i)] + values[i]) * factor
+                    if fatigue < best[subset]:
+                        best[subset] = fatigue
+                        last[subset] = i
+
+        order = []
+        subset = (1 << size) - 1
+        while subset:
+            order.append(tasks[last[subset]])
+            subset ^= 1 << last[subset]
+        order.reverse()
+        self.order_cache[key] = (best[-1], order)
+        return self.order_cache[key]
+
+    def assign_general_hours(self, masks):
+        """
+        與 assign_general_tasks 相同，把所有任務依序放進最早一天最早的連續空閒時段。
+        :param masks: 每天被固定任務占用的時段
+        :return: 每天依加入順序的 (開始時間, 難度, 時間)
+        """
+        masks = list(masks)
+        entries = [[] for _ in masks]
+        for task in self.general_order:
+            duration = int(task["time"])
+            for day in range(7):
+                start_time = self.first_free_hour(masks[day], duration)
+                if start_time is not None:
+                    if duration > 0:
+                        masks[day] |= ((1 << duration) - 1) << (start_time - 9)
+                    entries[day].append((start_time, task["difficulty"], task["time"]))
+                    break
+        return entries
 
-            # 計算疲勞值
-            fatigue = self.calculate_fatigue()
+    def first_free_hour(self, mask, duration):
+        """
+        最早能放下 duration 小時的開始時間，放不下時回傳 None（不到一小時的任務放在最早的空閒時段）。
+        """
+        run = (1 << max(duration, 1)) - 1
+        for offset in range(8 - max(duration, 1) + 1):
+            if not mask & (run << offset):
+                return 9 + offset
+        return None
 
-            if fatigue < self.min_fatigue:
-                self.min_fatigue = fatigue
-                self.best_schedule = self.schedule.copy()
+    def time_factor(self, start_time):
+        """
+        與 calculate_fatigue 相同的時間段疲勞係數。
+        """
+        if 9 <= start_time < 12:
+            return 1
+        elif 12 <= start_time < 17:
+            return 1.2
+        return 1.5
 
-        # 基於最佳結果生成行程表
-        best_schedule_df = self.generate_schedule_dataframe(schedule=self.best_schedule)
-        return best_schedule_df, self.min_fatigue
+    def day_fatigue(self, entries, task_count, daily_fatigue=0, difficulty_sum=0):
+        """
+        用 calculate_fatigue 的公式接著計算一天的疲勞值。
+        :param entries: 依加入順序的 (開始時間, 難度, 時間)
+        :param task_count: 當天最後的任務數（公式中的平均難度用最後的任務數）
+        :param daily_fatigue: 之前的任務累積的疲勞值
+        :param difficulty_sum: 之前的任務的難度總和
+        """
+        for start_time, difficulty, spent_time in entries:
+            daily_fatigue += difficulty * spent_time * self.time_factor(start_time)
+            difficulty_sum += difficulty
+            daily_fatigue = daily_fatigue * (1 + (difficulty_sum / task_count) ** 2)
+        return daily_fatigue
 
 
 #region menu_dict區
@@ -4,6 +4,7 @@ import os
 import json
 import copy
 import csv
+import numpy as np
 from datetime import datetime, timedelta
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -15,6 +16,9 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QMimeData, QTime, QThread, Signal
 from PySide6.QtGui import QDrag, QPixmap, QPainter
 
+from scheduler import batch_day_fatigue
+from free_intervals import FreeIntervalIndex
+
 # Constants
 SETTINGS_FILE = "settings.json"
 TASKS_FILE = "tasks.txt"
@@ -80,14 +84,48 @@ class Scheduler:
             total_fatigue += daily_fatigue
         return total_fatigue
 
-    def greedy_optimize(self):
+    def batch_calculate_fatigue(self, schedules):
+        """
+        一次計算多個候選排程的疲勞值，計算方式與 calculate_fatigue 相同。
+
+        :param schedules: 候選排程列表（每個為 7 x num_intervals_per_day 的任務網格），
+                          或已編碼的 NumPy 陣列（候選數 x 7 x 時間區間數，值為 self.tasks 的索引，-1 表示空閒）
+        :return: (每個候選排程的總疲勞值, 每個候選排程每天的疲勞值)
+        """
+        task_index = {task["name"]: index for index, task in enumerate(self.tasks)}
+        if not isinstance(schedules, np.ndarray):
+            encoded = np.full((len(schedules), 7, self.num_intervals_per_day), -1, dtype=np.int64)
+            for candidate, schedule in enumerate(schedules):
+                for day_index, day_tasks in enumerate(schedule):
+                    for slot_index, task in enumerate(day_tasks):
+                        if task:
+                            encoded[candidate, day_index, slot_index] = task_index[task["name"]]
+            schedules = encoded
+        task_fatigue = [self.fatigue_calculation(task) for task in self.tasks]
+        task_priority = [task.get("priority", 0) for task in self.tasks]
+        return batch_day_fatigue(schedules, task_fatigue, task_priority, count_repeats=True)
+
+    def greedy_optimize(self, strategy="first_fit"):
         """
         使用貪心算法來分配任務，優先分配優先級高的任務。
+
+        :param strategy: 每個非固定任務的放置策略:
+                         "first_fit" 放在最早一天最早的空檔（預設，與原本行為相同）;
+                         "best_fit" 放在剛好放得下的最短空檔，保留長空檔給之後的長任務;
+                         "worst_fit" 放在最長的空檔，讓剩下的空檔仍然夠長;
+                         "min_fatigue" 放在疲勞值增加最少的一天（同一天內用 best_fit 的位置）。
+                         同分時選較早的一天。
         """
+        if strategy not in ("first_fit", "best_fit", "worst_fit", "min_fatigue"):
+            raise ValueError(f"未知的排程策略: {strategy}")
         # 排序任務，優先分配優先級高的
         sorted_tasks = sorted(self.tasks, key=lambda x: x.get("priority", 1), reverse=True)
         temp_schedule = [[None for _ in range(self.num_intervals_per_day)] for _ in range(7)]
-        total_fatigue = 0
+        # 每天的空閒區間索引，首次適配為對數時間查找
+        free_intervals = [FreeIntervalIndex(self.num_intervals_per_day) for _ in range(7)]
+        # 每天已排時段的疲勞值總和與優先級總和，當天疲勞值 = 疲勞值總和 * (1 + 優先級總和)
+        day_fatigue = [0] * 7
+        day_priority = [0] * 7
 
         for task in sorted_tasks:
             duration = int(task["time"])
@@ -100,22 +138,45 @@ class Scheduler:
                 start_slot = int((start_hour - self.start_time) * (60 // self.interval_minutes) + start_minute / self.interval_minutes)
                 if 0 <= start_slot <= self.num_intervals_per_day - num_slots:
                     # 檢查是否有空閒
-                    if all(temp_schedule[day_index][slot] is None for slot in range(start_slot, start_slot + num_slots)):
-                        for slot in range(start_slot, start_slot + num_slots):
-                            temp_schedule[day_index][slot] = task
+                    if free_intervals[day_index].is_free(start_slot, num_slots):
                         assigned = True
             else:
+                best = None
                 for day_index in range(7):
-                    for start_slot in range(self.num_intervals_per_day - num_slots + 1):
-                        if all(temp_schedule[day_index][slot] is None for slot in range(start_slot, start_slot + num_slots)):
-                            for slot in range(start_slot, start_slot + num_slots):
-                                temp_schedule[day_index][slot] = task
-                            assigned = True
+                    if strategy == "first_fit":
+                        start_slot = free_intervals[day_index].first_fit(num_slots)
+                        if start_slot is not None:
+                            best = (0, day_index, start_slot)
                             break
-                    if assigned:
-                        break
-
-            if not assigned:
+                        continue
+                    if strategy == "worst_fit":
+                        start_slot = free_intervals[day_index].worst_fit(num_slots)
+                    else:
+                        start_slot = free_intervals[day_index].best_fit(num_slots)
+                    if start_slot is None:
+                        continue
+                    if strategy == "min_fatigue":
+                        # 當天加入 num_slots 個時段後疲勞值的增加量
+                        added_fatigue = num_slots * self.fatigue_calculation(task)
+                        added_priority = num_slots * task.get("priority", 0)
+                        key = (day_fatigue[day_index] + added_fatigue) * (1 + day_priority[day_index] + added_priority) \
+                            - day_fatigue[day_index] * (1 + day_priority[day_index])
+                    else:
+                        length = free_intervals[day_index].length_at.get(start_slot, 0)
+                        key = length if strategy == "best_fit" else -length
+                    if best is None or key < best[0]:
+                        best = (key, day_index, start_slot)
+                if best is not None:
+                    _, day_index, start_slot = best
+                    assigned = True
+
+            if assigned:
+                free_intervals[day_index].allocate(start_slot, num_slots)
+                for slot in range(start_slot, start_slot + num_slots):
+                    temp_schedule[day_index][slot] = task
+                day_fatigue[day_index] += num_slots * self.fatigue_calculation(task)
+                day_priority[day_index] += num_slots * task.get("priority", 0)
+            else:
                 print(f"未能分配任務: {task['name']}")
 
         self.best_schedule = temp_schedule
@@ -0,0 +1,149 @@
+# milp_backends.py
+# Optional integer-programming backends for Scheduler.solve_milp.
+# Both solvers run locally; if neither package is installed the scheduler keeps using its own search.
+try:
+    from ortools.sat.python import cp_model
+except ImportError:
+    cp_model = None
+
+try:
+    import pulp
+except ImportError:
+    pulp = None
+
+# CP-SAT only takes integer coefficients: objective coefficients are multiplied by this and rounded
+OBJECTIVE_SCALE = 100
+
+
+class CpSatModel:
+    """
+    Thin wrapper around an OR-Tools CP-SAT model.
+    """
+    name = "ortools"
+
+    def __init__(self):
+        self.model = cp_model.CpModel()
+        self.solver = None
+        self.exact = True
+
+    def bool_var(self, name):
+        return self.model.NewBoolVar(name)
+
+    def add_exactly_one(self, variables):
+        self.model.AddExactlyOne(variables)
+
+    def add_at_most_one(self, variables):
+        self.model.AddAtMostOne(variables)
+
+    def add_at_least(self, terms, lower):
+        """
+        sum(coefficient * variable for coefficient, variable in terms) >= lower
+        """
+        self.model.Add(sum(coefficient * variable for coefficient, variable in terms) >= lower)
+
+    def hint(self, variable, value):
+        """
+        Suggest a value from a known solution (e.g. the warm start).
+        """
+        self.model.AddHint(variable, int(value))
+
+    def minimize(self, terms):
+        scaled = []
+        for coefficient, variable in terms:
+            value = round(coefficient * OBJECTIVE_SCALE)
+            if abs(value - coefficient * OBJECTIVE_SCALE) > 1e-6:
+                self.exact = False  # the optimum of the rounded objective may not be the true optimum
+            scaled.append(value * variable)
+        self.model.Minimize(sum(scaled))
+
+    def solve(self, time_limit=None):
+        """
+        :return: "optimal", "feasible" or "infeasible" ("unknown" when the time limit ran out first).
+        """
+        self.solver = cp_model.CpSolver()
+        if time_limit is not None:
+            self.solver.parameters.max_time_in_seconds = max(time_limit, 0.0)
+        status = self.solver.Solve(self.model)
+        if status == cp_model.OPTIMAL:
+            return "optimal"
+        if status == cp_model.FEASIBLE:
+            return "feasible"
+        if status == cp_model.INFEASIBLE:
+            return "infeasible"
+        return "unknown"
+
+    def value(self, variable):
+        return bool(self.solver.BooleanValue(variable))
+
+
+class PulpModel:
+    """
+    Thin wrapper around a PuLP problem solved with the bundled CBC solver.
+    """
+    name = "pulp"
+
+    def __init__(self):
+        self.problem = pulp.LpProblem("schedule", pulp.LpMinimize)
+        self.exact = True
+        self.warm_start = False
+
+    def bool_var(self, name):
+        return pulp.LpVariable(name, cat="Binary")
+
+    def add_exactly_one(self, variables):
+        self.problem += pulp.lpSum(variables) == 1
+
+    def add_at_most_one(self, variables):
+        self.problem += pulp.lpSum(variables) <= 1
+
+    def add_at_least(self, terms, lower):
+        self.problem += pulp.lpSum(coefficient * variable for coefficient, variable in terms) >= lower
+
+    def hint(self, variable, value):
+        variable.setInitialValue(int(value))
+        self.warm_start = True
+
+    def minimize(self, terms):
+        self.problem.setObjective(pulp.lpSum(coefficient * variable for coefficient, variable in terms))
+
+    def solve(self, time_limit=None):
+        solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=None if time_limit is None else max(time_limit, 0.0),
+                                   warmStart=self.warm_start)
+        self.problem.solve(solver)
+        status = pulp.LpStatus[self.problem.status]
+        has_solution = self.problem.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+        if status == "Optimal" and self.problem.sol_status == pulp.LpSolutionOptimal:
+            return "optimal"
+        if has_solution:
+            return "feasible"
+        if status == "Infeasible":
+            return "infeasible"
+        return "unknown"
+
+    def value(self, variable):
+        return (variable.varValue or 0) > 0.5
+
+
+BACKENDS = {"ortools": (CpSatModel, cp_model), "pulp": (PulpModel, pulp)}
+
+
+def available_backends():
+    """
+    Names of the installed backends, in order of preference.
+    """
+    return [name for name, (_, module) in BACKENDS.items() if module is not None]
+
+
+def create_model(backend=None):
+    """
+    New empty model of the given backend (default: the first installed one), or None if it is not installed.
+    """
+    if backend is None:
+        installed = available_backends()
+        if not installed:
+            return None
+        backend = installed[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的求解器: {backend}")
+    model_class, module = BACKENDS[backend]
+    return model_class() if module is not None else None
@@ -1,9 +1,144 @@
 # scheduler.py
+import ast
+import bisect
 import copy
+import heapq
+import multiprocessing
+import os
 import numpy as np
-import re
 from functools import lru_cache
 import json
+import math
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from milp_backends import create_model
+
+# Rounding slack so a floating-point lower bound never cuts a strictly better schedule
+BOUND_TOLERANCE = 1e-9
+# How many search nodes to visit between two wall-clock checks of the time budget
+BUDGET_CHECK_INTERVAL = 256
+# Seconds between two checkpoints of a backtracking search run with checkpoint_path
+CHECKPOINT_INTERVAL = 60
+# Format version of the checkpoint files, see Scheduler.write_checkpoint
+CHECKPOINT_VERSION = 1
+# Number of distinct day compositions whose fatigue is memoized, see Scheduler.day_fatigue_cache
+DAY_FATIGUE_CACHE_SIZE = 1 << 16
+# Number of distinct day compositions whose transposition table signature is memoized
+DAY_SIGNATURE_CACHE_SIZE = 1 << 16
+# Number of slots of the backtracking search's transposition table, unless given
+TRANSPOSITION_TABLE_SIZE = 1 << 16
+# Largest number of floating tasks for the day-partition solver (it tabulates all 2**n task subsets)
+DAY_PARTITION_MAX_TASKS = 20
+# Where greedy_schedule puts each floating task, see Scheduler.choose_slot
+PLACEMENT_STRATEGIES = ("min_fatigue", "first_fit", "best_fit", "worst_fit")
+# Temperature of simulated annealing at the end of the budget, relative to the start temperature
+ANNEAL_FINAL_RATIO = 1e-3
+# Node budget of each exact sub-problem of Scheduler.large_neighborhood_search
+LNS_SUBPROBLEM_NODE_LIMIT = 20000
+# Most tasks Scheduler.large_neighborhood_search frees at once, more and its sub-problems are rarely solved exactly
+LNS_MAX_FREED_TASKS = 8
+# Syntax allowed in user fatigue expressions (besides numbers and allowed variable names)
+EXPRESSION_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.UAdd, ast.USub,
+)
+
+
+class TaskTable:
+    """
+    Column store of the tasks being scheduled, indexed by integer task id.
+
+    Task id i is the i-th task dict. Numeric attributes are kept in contiguous NumPy arrays, with plain-list
+    copies for the per-node lookups of the search. Task names are interned to name ids: tasks sharing a name
+    share a name id and count once per day, with the attributes of the one with the lowest task id (the one
+    the search places first). Indexing the table with a task id returns the original dict.
+    A task's "dependencies" (task names) become prerequisite task ids: it may only start once all of them end.
+    """
+
+    def __init__(self, tasks, slot_count, fixed_start_slot):
+        """
+        :param tasks: Task dicts with task["fatigue"] precomputed; their order defines the task ids.
+        :param slot_count: Function giving the number of time slots of a task.
+        :param fixed_start_slot: Function converting a task's fixed_time into (day_index, start_slot).
+        """
+        self.tasks = list(tasks)
+        self.task_ids = {id(task): task_id for task_id, task in enumerate(self.tasks)}  # see id_of
+        self.name_ids = {}
+        self.names = []
+        self.name_task = []  # name id -> first task id with that name
+        name_ids = []
+        for task_id, task in enumerate(self.tasks):
+            if task["name"] not in self.name_ids:
+                self.name_ids[task["name"]] = len(self.names)
+                self.names.append(task["name"])
+                self.name_task.append(task_id)
+            name_ids.append(self.name_ids[task["name"]])
+        self.unique_names = len(self.names) == len(self.tasks)
+        # Variant ids: tasks sharing a name and the fatigue and difficulty, which are interchangeable on a day.
+        # uniform_names when every name has a single variant, so a day's names alone fix its fatigue.
+        variants = {}
+        self.variant_id = [variants.setdefault((task["name"], task["fatigue"], task["difficulty"]), len(variants))
+                           for task in self.tasks]
+        self.uniform_names = len(variants) == len(self.names)
+
+        self.name_id = np.array(name_ids, dtype=np.int64)
+        self.difficulty = np.array([task["difficulty"] for task in self.tasks], dtype=float)
+        self.time = np.array([task["time"] for task in self.tasks], dtype=float)
+        self.priority = np.array([np.nan if task.get("priority") is None else task["priority"]
+                                  for task in self.tasks], dtype=float)
+        self.fatigue = np.array([task["fatigue"] for task in self.tasks], dtype=float)
+        self.slots = np.array([slot_count(task) for task in self.tasks], dtype=np.int64)
+        # (day_index, start_slot) of fixed_time tasks, None for floating ones
+        self.fixed = [fixed_start_slot(task) if task.get("fixed_time") else None for task in self.tasks]
+
+        # Plain lists for scalar access in the search loops (indexing a NumPy array per node is slower);
+        # the original values are kept so per-day sums stay exact for integer attributes
+        self.name_bit = [1 << name_id for name_id in name_ids]
+        self.fatigue_of = [task["fatigue"] for task in self.tasks]
+        self.difficulty_of = [task["difficulty"] for task in self.tasks]
+        self.slots_of = self.slots.tolist()
+
+        # Every task carrying a name in the dependencies is a prerequisite; dependents is the reverse relation
+        name_tasks = [[] for _ in self.names]
+        for task_id, name_id in enumerate(name_ids):
+            name_tasks[name_id].append(task_id)
+        self.prerequisites = []
+        self.dependents = [[] for _ in self.tasks]
+        for task_id, task in enumerate(self.tasks):
+            prerequisites = []
+            for name in task.get("dependencies") or ():
+                if name not in self.name_ids:
+                    raise ValueError(f"找不到前置任務: {name}")
+                prerequisites.extend(name_tasks[self.name_ids[name]])
+            prerequisites = tuple(dict.fromkeys(prerequisites))
+            self.prerequisites.append(prerequisites)
+            for other in prerequisites:
+                self.dependents[other].append(task_id)
+        self.has_dependencies = any(self.prerequisites)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, task_id):
+        return self.tasks[task_id]
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+    def id_of(self, task):
+        """
+        Task id of a task dict (by identity), or None if it is not in the table.
+        """
+        return self.task_ids.get(id(task))
+
+    def by_name(self, name):
+        """
+        First task dict with the given name.
+        """
+        return self.tasks[self.name_task[self.name_ids[name]]]
 
 
 class Scheduler:
@@ -29,8 +164,16 @@ class Scheduler:
         self.days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
         self.num_intervals_per_day = int((self.end_time - self.start_time) * 60 / self.interval_minutes)
 
-        # Initialize schedule structure: 7 days, each with a fixed number of time slots, default to None
-        self.schedule = [[None for _ in range(self.num_intervals_per_day)] for _ in range(7)]
+        self.full_day_mask = (1 << self.num_intervals_per_day) - 1
+
+        # Occupancy of each day as an integer bitmask (bit i set = slot i taken).
+        # The list-of-dicts grid is only materialized on demand, see `schedule`.
+        self.day_masks = [0 for _ in range(7)]
+        self.placements = []  # (task_id, day_index, start_slot, num_slots), see TaskTable
+        self.placement_position = {}
+        self.task_day = {}
+        self.task_start = {}
+        self.move_log = []
 
         self.tasks = []
         self.task_dict = {}
@@ -39,14 +182,32 @@ class Scheduler:
         # Variables for tracking the best schedule
         self.min_fatigue = float('inf')
         self.best_schedule = None
+        self.best_placements = None
         self.best_day_fatigue = None  # 用於存儲最佳排程時每天的疲勞值
 
+        # Array-backed view of self.tasks used by the search, rebuilt by index_tasks
+        self.task_table = TaskTable([], self.slot_count, self.fixed_start_slot)
+        self.task_signature = None
+        self.reset_day_fatigue_cache()
+
         # Variables for incremental fatigue calculation
-        self.day_unique_tasks = [set() for _ in range(7)]
-        self.day_difficulty_sum = [0 for _ in range(7)]
-        self.day_fatigue_sum = [0.0 for _ in range(7)]
-        self.day_fatigue = [0.0 for _ in range(7)]
-        self.total_fatigue = 0.0
+        self.reset_day_tracking()
+        self.search_stats = {}
+        self.on_improvement = None
+        self.proven_optimal = False
+        self.checkpoint_path = None
+        self.checkpoint_interval = CHECKPOINT_INTERVAL
+        self.start_budget()
+        self.transposition_size = 0
+        self.transposition_table = None
+        self.top_k = None
+        self.search_stack = []
+        self.search_days = tuple(range(7))  # days floating tasks may go on, see solve_neighborhood
+
+        # Set in parallel workers only (see minimize_total_fatigue_parallel)
+        self.shared_best = None
+        self.shared_bound = float('inf')
+        self.subproblem_budget = (None, None)
 
     def default_fatigue_calculation(self, task):
         """
@@ -55,132 +216,1943 @@ class Scheduler:
         return task.get("difficulty", 1) * task.get("time", 1)
 
     def calculate_fatigue(self):
-        total_fatigue = 0
-        task_mapping = {task['name']: task for task in self.tasks}
+        """
+        Total fatigue of the current placements, each day's looked up in `day_fatigue_cache`.
+        """
+        self.index_tasks()
+        day_task_ids = [0 for _ in range(7)]
+        for task_id, day_index, _, _ in self.placements:
+            day_task_ids[day_index] |= 1 << task_id
+        return sum(self.day_fatigue_cache(task_ids) for task_ids in day_task_ids)
+
+    def reset_day_fatigue_cache(self):
+        """
+        Bounded LRU cache mapping a day's task set (bitset of task ids, bit i = task id i) to the day's fatigue,
+        see `compute_day_fatigue`. Keys are only valid for the current `task_table`, so index_tasks resets it.
+        Hit and miss counters: day_fatigue_cache.cache_info(), and search_stats after a search.
+        """
+        self.day_fatigue_cache = lru_cache(maxsize=DAY_FATIGUE_CACHE_SIZE)(self.compute_day_fatigue)
+        self.day_fatigue_cache_counted = (0, 0)
+
+    def compute_day_fatigue(self, task_ids):
+        """
+        Fatigue of a day holding a set of tasks: sum(task fatigue) * (1 + sum(difficulty)), a task name
+        counted once with the attributes of its lowest task id in the set.
+        """
+        table = self.task_table
+        task_bits = 0
+        fatigue_sum = 0.0
+        difficulty_sum = 0
+        while task_ids:
+            low = task_ids & -task_ids
+            task_id = low.bit_length() - 1
+            if not task_bits & table.name_bit[task_id]:
+                task_bits |= table.name_bit[task_id]
+                fatigue_sum += table.fatigue_of[task_id]
+                difficulty_sum += table.difficulty_of[task_id]
+            task_ids ^= low
+        return fatigue_sum * (1 + difficulty_sum) if task_bits else 0.0
+
+    def count_day_fatigue_cache(self):
+        """
+        Add the hits and misses of `day_fatigue_cache` since the last count to search_stats.
+        """
+        hits, misses = self.day_fatigue_cache.cache_info()[:2]
+        counted_hits, counted_misses = self.day_fatigue_cache_counted
+        self.search_stats["day_fatigue_cache_hits"] = \
+            self.search_stats.get("day_fatigue_cache_hits", 0) + hits - counted_hits
+        self.search_stats["day_fatigue_cache_misses"] = \
+            self.search_stats.get("day_fatigue_cache_misses", 0) + misses - counted_misses
+        self.day_fatigue_cache_counted = (hits, misses)
+
+    def encode_schedules(self, schedules):
+        """
+        Encode candidate schedules for `batch_calculate_fatigue`.
+
+        :param schedules: List of schedules, each either a 7-day grid of task dicts (like best_schedule)
+                          or a list of (task_id, day_index, start_slot, num_slots) placements.
+        :return: int array (candidates x 7 x num_intervals_per_day) of task name ids, -1 for free slots.
+        """
+        self.index_tasks()
+        table = self.task_table
+        encoded = np.full((len(schedules), 7, self.num_intervals_per_day), -1, dtype=np.int64)
+        for candidate, schedule in enumerate(schedules):
+            if len(schedule) == 7 and all(isinstance(day_slots, list) for day_slots in schedule):
+                for day_index, day_slots in enumerate(schedule):
+                    for slot, task in enumerate(day_slots):
+                        if task is not None:
+                            encoded[candidate, day_index, slot] = table.name_ids[task["name"]]
+            else:
+                for task_id, day_index, start_slot, num_slots in schedule:
+                    encoded[candidate, day_index, start_slot:start_slot + num_slots] = table.name_id[task_id]
+        return encoded
+
+    def batch_calculate_fatigue(self, schedules, task_fatigue=None, task_difficulty=None):
+        """
+        Score many candidate schedules in one vectorized call.
+
+        :param schedules: int array (candidates x 7 x slots) of task name ids as produced by `encode_schedules`,
+                          or a list of schedules that is encoded first.
+        :param task_fatigue: Per-name-id fatigue array, default the current tasks' fatigue (of the lowest task
+                             id with each name; the grid does not tell same-name tasks apart).
+        :param task_difficulty: Per-name-id difficulty array, default the current tasks' difficulty.
+        :return: (total fatigue per candidate, fatigue per candidate and day)
+        """
+        if task_fatigue is None or task_difficulty is None:
+            self.index_tasks()
+            table = self.task_table
+            if task_fatigue is None:
+                task_fatigue = table.fatigue[table.name_task]
+            if task_difficulty is None:
+                task_difficulty = table.difficulty[table.name_task]
+        if not isinstance(schedules, np.ndarray):
+            schedules = self.encode_schedules(schedules)
+        return batch_day_fatigue(schedules, task_fatigue, task_difficulty)
+
+    def index_tasks(self):
+        """
+        If the task list, any task's attributes or fatigue_calculation changed since the last call, compute
+        task["fatigue"] for every task and rebuild `task_table`.
+        """
+        signature = (self.fatigue_calculation,
+                     [(id(task), {key: value for key, value in task.items() if key != "fatigue"},
+                       tuple(task.get("dependencies") or ())) for task in self.tasks])
+        if signature == self.task_signature:
+            return
+        for task in self.tasks:
+            task["fatigue"] = self.fatigue_calculation(task)
+        self.task_signature = signature
+        self.task_table = TaskTable(self.tasks, self.slot_count, self.fixed_start_slot)
+        self.reset_day_fatigue_cache()
+
+    @property
+    def schedule(self):
+        """
+        The current placements as a 7 x num_intervals_per_day grid of task dicts (None = free).
+        Built on demand; the search itself only works on `day_masks` / `placements`.
+        """
+        return self.build_schedule_grid(self.placements)
+
+    def build_schedule_grid(self, placements):
+        """
+        Materialize a list of (task_id, day_index, start_slot, num_slots) placements into a grid.
+        """
+        grid = [[None for _ in range(self.num_intervals_per_day)] for _ in range(7)]
+        for task_id, day_index, start_slot, num_slots in placements:
+            task = self.task_table[task_id]
+            for slot in range(start_slot, start_slot + num_slots):
+                grid[day_index][slot] = task
+        return grid
 
-        for day_index, day_slots in enumerate(self.schedule):
-            daily_fatigue = 0
-            daily_difficulty_sum = 0
-            unique_tasks = set()
+    def slot_count(self, task):
+        """
+        Number of time slots a task occupies.
+        """
+        return int(task["time"] * (60 / self.interval_minutes))
 
-            for slot in day_slots:
-                if slot is not None:
-                    unique_tasks.add(slot["name"])
+    def fixed_start_slot(self, task):
+        """
+        Convert a task's fixed_time, e.g. ('Monday', 9, 0), into (day_index, start_slot).
+        """
+        day, start_hour, start_minute = task["fixed_time"]
+        day_index = self.days.index(day)
+        start_slot = int(
+            (start_hour - self.start_time) * (60 / self.interval_minutes) + start_minute / self.interval_minutes)
+        return day_index, start_slot
 
-            for task_name in unique_tasks:
-                task = task_mapping[task_name]
-                task_fatigue = self.fatigue_calculation(task)
-                daily_fatigue += task_fatigue
-                daily_difficulty_sum += task["difficulty"]
+    def is_free(self, day_index, start_slot, num_slots):
+        """
+        Check whether slots start_slot .. start_slot + num_slots - 1 of a day are all free (single mask AND).
+        """
+        run = ((1 << num_slots) - 1) << start_slot
+        return not (self.day_masks[day_index] & run)
 
-            daily_fatigue *= (1 + daily_difficulty_sum)
-            total_fatigue += daily_fatigue
+    def free_start_mask(self, day_index, num_slots):
+        """
+        Bitmask of every start slot on a day where a run of num_slots free slots begins.
+        """
+        if num_slots <= 0:
+            return (1 << (self.num_intervals_per_day + 1)) - 1
+        runs = ~self.day_masks[day_index] & self.full_day_mask
+        # runs has bit s set when s .. s + span - 1 are free; widen the window by doubling
+        span = 1
+        while span < num_slots:
+            step = min(span, num_slots - span)
+            runs &= runs >> step
+            span += step
+        return runs
+
+    def dependency_window(self, task_id):
+        """
+        (earliest start, latest end) of a task in week slots (day_index * num_intervals_per_day + slot):
+        it starts after its placed prerequisites end and ends before its placed dependents start.
+        """
+        table = self.task_table
+        earliest, latest = 0, 7 * self.num_intervals_per_day
+        for other in table.prerequisites[task_id]:
+            if other in self.task_start:
+                earliest = max(earliest, self.task_start[other] + table.slots_of[other])
+        for other in table.dependents[task_id]:
+            if other in self.task_start:
+                latest = min(latest, self.task_start[other])
+        return earliest, latest
+
+    def allowed_starts(self, task_id, day_index, window=None):
+        """
+        `free_start_mask` of a task on a day, restricted to its `dependency_window`.
+        """
+        num_slots = self.task_table.slots_of[task_id]
+        starts = self.free_start_mask(day_index, num_slots)
+        if window is None:
+            if not self.task_table.has_dependencies:
+                return starts
+            window = self.dependency_window(task_id)
+        earliest, latest = window
+        first = earliest - day_index * self.num_intervals_per_day
+        last = latest - num_slots - day_index * self.num_intervals_per_day
+        if last < first:
+            return 0
+        if first > 0:
+            starts &= ~((1 << first) - 1)
+        return starts & ((1 << (last + 1)) - 1) if last >= 0 else 0
+
+    def occupy(self, task_id, day_index, start_slot, num_slots):
+        """
+        Mark a run of slots as taken by a task.
+        """
+        self.day_masks[day_index] |= ((1 << num_slots) - 1) << start_slot
+        self.placement_position[task_id] = len(self.placements)
+        self.placements.append((task_id, day_index, start_slot, num_slots))
+        self.task_day[task_id] = day_index
+        self.task_start[task_id] = day_index * self.num_intervals_per_day + start_slot
 
-        return total_fatigue
+    def release(self, position=-1):
+        """
+        Undo an `occupy`, by default the most recent one. The last placement takes the released position.
+        """
+        placements = self.placements
+        if position < 0:
+            position += len(placements)
+        last = placements.pop()
+        if position < len(placements):
+            task_id, day_index, start_slot, num_slots = placements[position]
+            placements[position] = last
+            self.placement_position[last[0]] = position
+        else:
+            task_id, day_index, start_slot, num_slots = last
+        del self.placement_position[task_id]
+        self.day_masks[day_index] &= ~(((1 << num_slots) - 1) << start_slot)
+        del self.task_day[task_id]
+        del self.task_start[task_id]
+        return task_id, day_index, start_slot, num_slots
+
+    def place(self, task_id, day_index, start_slot):
+        """
+        `occupy` plus the per-day fatigue tracking.
+        """
+        self.occupy(task_id, day_index, start_slot, self.task_table.slots_of[task_id])
+        self.add_to_day(task_id, day_index)
+
+    def unplace(self, position):
+        """
+        Revert `place` for the placement at a position of self.placements.
+        The day keeps the task's name while another task with the same name is still on it.
+        """
+        task_id, day_index, start_slot, num_slots = self.release(position)
+        self.remove_from_day(task_id, day_index)
+        return task_id, day_index, start_slot, num_slots
+
+    def position_of(self, task_id):
+        """
+        Position of a task's placement in self.placements.
+        """
+        return self.placement_position[task_id]
+
+    def clear_schedule(self):
+        self.day_masks = [0 for _ in range(7)]
+        self.placements = []
+        self.placement_position = {}  # task_id -> position in self.placements, see position_of
+        self.task_day = {}  # task_id -> day_index of its placement
+        self.task_start = {}  # task_id -> start of its placement in week slots, see dependency_window
+        self.move_log = []  # undo functions of the moves applied with move_task / swap_tasks / remove_task
 
     def assign_task(self, task):
         """
         Try to assign a task to the schedule.
         Assign higher priority tasks first.
         """
-        duration = task["time"]  # Duration in hours
-        num_slots = int(duration * (60 / self.interval_minutes))  # Convert to number of slots
-
-        if task.get("fixed_time"):
-            day, start_hour, start_minute = task["fixed_time"]  # e.g., ('Monday', 9, 0)
-            day_index = self.days.index(day)
-            start_slot = int(
-                (start_hour - self.start_time) * (60 / self.interval_minutes) + start_minute / self.interval_minutes)
+        self.index_tasks()
+        task_id = self.task_table.id_of(task)
+        if task_id is None:
+            self.add_tasks([task])
+            self.index_tasks()
+            task_id = len(self.tasks) - 1
+        num_slots = self.task_table.slots_of[task_id]
+        fixed_position = self.task_table.fixed[task_id]
+
+        if fixed_position is not None:
+            day_index, start_slot = fixed_position  # e.g., ('Monday', 9, 0)
             if start_slot < 0 or start_slot + num_slots > self.num_intervals_per_day:
                 return False  # Fixed time out of range
 
-            # Check if the specified time slots are free
-            for slot in range(start_slot, start_slot + num_slots):
-                if self.schedule[day_index][slot] is not None:
-                    return False  # Time slot already occupied
+            # Check if the specified time slots are free (and after the task's prerequisites)
+            if not self.allowed_starts(task_id, day_index) >> start_slot & 1:
+                return False  # Time slot already occupied
 
-            # Assign task to the specified time slots
-            for slot in range(start_slot, start_slot + num_slots):
-                self.schedule[day_index][slot] = task
+            self.occupy(task_id, day_index, start_slot, num_slots)
             return True
         else:
             # Try to find a suitable time slot throughout the week
             for day_index in range(7):
-                for start_slot in range(self.num_intervals_per_day - num_slots + 1):
-                    # Check if all consecutive slots are free
-                    if all(self.schedule[day_index][slot] is None for slot in range(start_slot, start_slot + num_slots)):
-                        # Assign task
-                        for slot in range(start_slot, start_slot + num_slots):
-                            self.schedule[day_index][slot] = task
-                        return True
+                starts = self.allowed_starts(task_id, day_index)
+                if starts:
+                    start_slot = (starts & -starts).bit_length() - 1  # lowest free start
+                    self.occupy(task_id, day_index, start_slot, num_slots)
+                    return True
             return False  # No available time slots
 
-    def minimize_total_fatigue(self):
+    def minimize_total_fatigue(self, use_bound=True, break_symmetry=True, warm_start=True,
+                               time_limit=None, node_limit=None, on_improvement=None, method="backtrack",
+                               forward_checking=False, transposition_size=None, top_k=None, checkpoint_path=None,
+                               checkpoint_interval=CHECKPOINT_INTERVAL):
         """
         Find the schedule that minimizes total fatigue using backtracking.
+
+        :param use_bound: Branch-and-bound mode. Cut subtrees whose fatigue plus an admissible lower bound
+                          on the remaining tasks can no longer beat the best schedule found so far.
+        :param break_symmetry: Only branch on one placement per group of equivalent ones (see
+                               `get_canonical_assignments`). Turn off for position-sensitive fatigue functions.
+                               Ignored when tasks have dependencies (placements are then position-sensitive).
+        :param warm_start: Seed the best schedule with `greedy_schedule` so pruning works from the first branch.
+                           search_stats then reports how many subtrees were cut while that seed was still the best.
+        :param time_limit: Stop the search after this many seconds and keep the best schedule found so far.
+        :param node_limit: Stop the search after visiting this many search nodes.
+        :param on_improvement: Called as on_improvement(schedule, min_fatigue, day_fatigue) every time a
+                               better schedule is found (including the warm start).
+        :param method: "backtrack"; "dp" to solve with `solve_day_partition` when it applies (falls back
+                       to backtracking otherwise); or "milp" to solve with `solve_milp` when ortools or pulp is
+                       installed (falls back like "dp" otherwise). search_stats["method"] tells which one ran.
+        :param forward_checking: Backtracking only. After every placement, recount the placements left to each
+                                 unplaced task and backtrack as soon as one has none; branch next on the task
+                                 with the fewest (see `most_constrained_task`). Ties between equally good
+                                 schedules may then resolve differently from the default search order.
+        :param transposition_size: Backtracking only. Number of slots of the transposition table (see
+                                   `transposition_cut_off`), 0 to search without one. By default the table is
+                                   used when symmetry breaking is off: tasks placed in each other's slots
+                                   then lead to the same state again and again. Canonical placements
+                                   already avoid most of those repeats, so the table seldom pays off there.
+        :param top_k: Backtracking only. Keep the top_k best distinct schedules instead of the best one and
+                      return them as a list of (schedule, fatigue, day_fatigue), best first (see
+                      `record_top_schedule`). With break_symmetry they differ in more than the order of tasks
+                      inside a free run. The search then prunes against the top_k-th best schedule, and runs
+                      without a transposition table.
+        :param checkpoint_path: Backtracking only. Write the search state to this file every
+                                checkpoint_interval seconds and when the search ends or stops (see
+                                `write_checkpoint`), so `resume_from_checkpoint` can continue it in a new process.
+        :param checkpoint_interval: Seconds between two checkpoints.
+        After a budget stop `proven_optimal` is False.
         """
-        # Precompute fatigue for each task
-        for task in self.tasks:
-            task["fatigue"] = self.fatigue_calculation(task)
+        if method not in ("backtrack", "dp", "milp"):
+            raise ValueError(f"未知的求解方法: {method}")
+        if top_k is not None and (not isinstance(top_k, int) or top_k < 1):
+            raise ValueError("top_k 必須是正整數。")
+        if top_k is not None and method != "backtrack":
+            raise ValueError("top_k 只能搭配回溯搜尋使用。")
+        if checkpoint_path is not None and method != "backtrack":
+            raise ValueError("檢查點只能搭配回溯搜尋使用。")
+        self.prepare_search(use_bound, break_symmetry, warm_start, on_improvement, forward_checking,
+                            transposition_size, top_k)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.start_budget(time_limit, node_limit)
+        if method == "milp" and self.solve_milp():
+            self.search_stats["method"] = "milp"
+        elif method in ("dp", "milp") and self.day_partition_applicable():
+            self.search_stats["method"] = "dp"
+            self.solve_day_partition()
+        else:
+            self.search_stats["method"] = "backtrack"
+            if self.forward_checking and self.tasks:
+                first_task = self.most_constrained_task()
+                if first_task is not None:
+                    self.backtrack(0, first_task)
+            else:
+                self.backtrack(0)
+            self.search_stats.update(self.transposition_stats())
+        self.proven_optimal = not self.search_stopped
+        result = self.finish_search()
+        return result if self.top_k is None else self.top_schedules
+
+    def prepare_search(self, use_bound=True, break_symmetry=True, warm_start=True, on_improvement=None,
+                       forward_checking=False, transposition_size=None, top_k=None):
+        """
+        Common setup of the exact solvers: task fatigue, search order, warm start and lower bound.
+        The search then works on task ids, which are the positions in the sorted self.tasks.
+        """
+        self.clear_schedule()
+        # As requested, for write_checkpoint (prepare_search itself may turn break_symmetry off)
+        self.search_options = {"use_bound": use_bound, "break_symmetry": break_symmetry,
+                               "forward_checking": forward_checking, "transposition_size": transposition_size,
+                               "top_k": top_k}
 
         # Sort tasks by priority ascending (lower priority first), tasks with priority=None last
         self.tasks.sort(key=lambda t: (t.get("priority") is None, t.get("priority", 0), self.count_possible_assignments(t)))
+        self.break_symmetry = break_symmetry
+        if self.break_symmetry:
+            # Canonical placements are only equivalent once every fixed_time task is on the grid
+            self.tasks.sort(key=lambda t: not t.get("fixed_time"))
+        # Precompute fatigue for each task and build the task table
+        self.index_tasks()
+        if self.task_table.has_dependencies:
+            # Prerequisites are searched before their dependents, so each placement knows when it may start
+            table = self.task_table
+            order = topological_order(range(len(table)), table.prerequisites, [task["name"] for task in table])
+            self.tasks = [self.tasks[task_id] for task_id in order]
+            self.index_tasks()
+            self.break_symmetry = False
 
         self.min_fatigue = float('inf')
         self.best_schedule = None
+        self.best_placements = None
         self.best_day_fatigue = None  # 初始化最佳每天疲勞值
-        self.total_fatigue = 0.0
-
-        self.backtrack(0)
+        self.reset_day_tracking()
+        self.forward_checking = forward_checking
+        self.search_stack = []
+        self.search_days = tuple(range(7))
+        self.checkpoint_path = None
+        self.top_k = top_k
+        self.top_heap = []  # max-heap of the top_k best schedules, see record_top_schedule
+        self.top_keys = set()
+        self.top_found = 0
+        self.top_best_fatigue = float('inf')
+        self.top_schedules = []
+        self.search_stats = {"nodes": 0, "pruned_by_bound": 0, "pruned_by_dependencies": 0,
+                             "pruned_by_forward_check": 0, "pruned_by_transposition": 0,
+                             "transposition_probes": 0, "transposition_hits": 0}
+        self.day_fatigue_cache_counted = self.day_fatigue_cache.cache_info()[:2]
+        self.warm_start_is_best = False
+        self.on_improvement = on_improvement
+
+        if warm_start:
+            seed = self.greedy_schedule()
+            if seed is not None:
+                self.record_best(*seed)
+                self.warm_start_is_best = True
+                self.search_stats.update(warm_start_fatigue=seed[1], pruned_by_warm_start=0)
+            self.clear_schedule()
+            self.reset_day_tracking()
+
+        # The bound assumes adding a task never lowers a day's fatigue, i.e. non-negative attributes
+        table = self.task_table
+        self.use_bound = use_bound and bool((table.fatigue >= 0).all() and (table.difficulty >= 0).all())
+        if self.use_bound:
+            self.prepare_lower_bound()
+        # Stored bounds only hold against a single incumbent
+        self.prepare_transposition_table(transposition_size if top_k is None else 0)
+
+    def finish_search(self):
+        self.count_day_fatigue_cache()
+        if self.search_stats.get("transposition_probes"):
+            self.search_stats["transposition_hit_rate"] = \
+                self.search_stats["transposition_hits"] / self.search_stats["transposition_probes"]
+        if "warm_start_fatigue" in self.search_stats:
+            self.search_stats["warm_start_optimal"] = self.warm_start_is_best
+        if self.top_k is not None:
+            ranked = sorted(self.top_heap, key=lambda entry: (-entry[0], -entry[1]))
+            self.top_schedules = [(self.build_schedule_grid(placements), -negative_fatigue, day_fatigue)
+                                  for negative_fatigue, _, _, placements, day_fatigue in ranked]
+            self.min_fatigue = self.top_schedules[0][1] if ranked else float('inf')
+        if self.best_placements is not None:
+            self.best_schedule = self.build_schedule_grid(self.best_placements)
         return self.best_schedule, self.min_fatigue, self.best_day_fatigue  # 修改返回值
 
-    def backtrack(self, index):
+    def solve_anytime(self, time_limit=None, node_limit=None, on_improvement=None, **options):
+        """
+        Anytime version of `minimize_total_fatigue`: search within a wall-clock and/or node budget.
+
+        :return: (best_schedule, min_fatigue, best_day_fatigue, proven_optimal), or with top_k
+                 (top_schedules, proven_optimal) where top_schedules is the list `minimize_total_fatigue` returns.
         """
-        Backtracking function to assign tasks and minimize fatigue.
+        result = self.minimize_total_fatigue(
+            time_limit=time_limit, node_limit=node_limit, on_improvement=on_improvement, **options)
+        if options.get("top_k") is not None:
+            return result, self.proven_optimal
+        best_schedule, min_fatigue, best_day_fatigue = result
+        return best_schedule, min_fatigue, best_day_fatigue, self.proven_optimal
+
+    def record_best(self, placements, total_fatigue, day_fatigue):
         """
-        if index >= len(self.tasks):
-            if self.total_fatigue < self.min_fatigue:
-                self.min_fatigue = self.total_fatigue
-                self.best_schedule = [list(day) for day in self.schedule]
-                self.best_day_fatigue = copy.deepcopy(self.day_fatigue)  # 保存當前每天的疲勞值
+        Store a new best schedule and notify the on_improvement callback.
+        """
+        if self.top_k is not None:
+            self.record_top_schedule(placements, total_fatigue, day_fatigue)
             return
+        self.min_fatigue = total_fatigue
+        self.best_placements = placements
+        self.best_day_fatigue = day_fatigue
+        if self.shared_best is not None:
+            with self.shared_best.get_lock():
+                if total_fatigue < self.shared_best.value:
+                    self.shared_best.value = total_fatigue
+        if self.on_improvement is not None:
+            self.on_improvement(self.build_schedule_grid(placements), total_fatigue, day_fatigue)
+
+    def record_top_schedule(self, placements, total_fatigue, day_fatigue):
+        """
+        top_k version of `record_best`. The schedules are kept in a bounded max-heap keyed on fatigue, so
+        the worst of them is dropped in O(log top_k) once there are more than top_k. min_fatigue is then the
+        top_k-th best fatigue (infinite until top_k schedules are found), which is what the search prunes
+        against. Of equally good schedules the earlier found ones stay, and a schedule that only swaps
+        tasks of the same name is not kept twice.
+        """
+        key = self.top_schedule_key(placements)
+        if key in self.top_keys:
+            return
+        is_best = self.best_placements is None or total_fatigue < self.top_best_fatigue
+        self.top_keys.add(key)
+        self.top_found += 1
+        heapq.heappush(self.top_heap, (-total_fatigue, -self.top_found, key, placements, day_fatigue))
+        if len(self.top_heap) > self.top_k:
+            self.top_keys.discard(heapq.heappop(self.top_heap)[2])
+        if len(self.top_heap) == self.top_k:
+            self.min_fatigue = -self.top_heap[0][0]
+        if is_best:
+            self.top_best_fatigue = total_fatigue
+            self.best_placements = placements
+            self.best_day_fatigue = day_fatigue
+            if self.on_improvement is not None:
+                self.on_improvement(self.build_schedule_grid(placements), total_fatigue, day_fatigue)
+
+    def top_schedule_key(self, placements):
+        """
+        Key telling apart the schedules of top_k mode: the placements, with tasks of the same name and
+        attributes alike.
+        """
+        table = self.task_table
+        return frozenset((table.variant_id[task_id], day_index, start_slot, num_slots)
+                         for task_id, day_index, start_slot, num_slots in placements)
+
+    def minimize_total_fatigue_parallel(self, max_workers=None, split_depth=None, use_bound=True,
+                                        break_symmetry=True, warm_start=True, time_limit=None, node_limit=None,
+                                        on_improvement=None):
+        """
+        Parallel version of `minimize_total_fatigue`.
+
+        The search tree is split after the first split_depth task placements and every subtree is solved in a
+        ProcessPoolExecutor. Workers share the best fatigue found so far through a multiprocessing.Value so
+        pruning stays effective. Ties are resolved in the serial search order, so the result is the same
+        schedule the serial solver returns.
+
+        :param max_workers: Number of worker processes, default os.cpu_count().
+        :param split_depth: Number of placements per subproblem; by default the smallest depth giving at least
+                            four subproblems per worker.
+        :param node_limit: Node budget of each subproblem.
+        Other parameters are the same as for `minimize_total_fatigue`; on_improvement is called in this process.
+        """
+        deadline = None if time_limit is None else time.time() + time_limit
+        max_workers = max_workers or os.cpu_count() or 1
+        self.prepare_search(use_bound, break_symmetry, warm_start, on_improvement)
+        self.start_budget()
+        subproblems = self.split_subproblems(split_depth, 4 * max_workers)
+
+        # Workers get a picklable copy; task fatigue is already precomputed so the fatigue function is not needed
+        worker = copy.copy(self)
+        worker.fatigue_calculation = None
+        worker.on_improvement = None
+        worker.transposition_table = None  # every subproblem starts with an empty table of its own
+        worker.day_signature = None  # rebuilt in the worker, lru_cache wrappers do not pickle
+        worker.day_fatigue_cache = None
+        incumbent = self.min_fatigue
+        shared_best = multiprocessing.Value('d', incumbent)
+
+        results = [None] * len(subproblems)
+        streamed_best = incumbent
+        self.search_stopped = False
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_subproblem_worker,
+                                 initargs=(worker, shared_best, deadline, node_limit)) as executor:
+            futures = [executor.submit(solve_subproblem, index, prefix) for index, prefix in enumerate(subproblems)]
+            for future in as_completed(futures):
+                index, fatigue, placements, day_fatigue, stats, stopped = future.result()
+                results[index] = (fatigue, placements, day_fatigue)
+                self.search_stopped = self.search_stopped or stopped
+                for key, value in stats.items():
+                    if key in ("nodes", "pruned_by_bound", "pruned_by_dependencies", "pruned_by_warm_start",
+                               "pruned_by_transposition", "transposition_probes", "transposition_hits",
+                               "day_fatigue_cache_hits", "day_fatigue_cache_misses"):
+                        self.search_stats[key] = self.search_stats.get(key, 0) + value
+                    elif key in ("transposition_entries", "transposition_bytes"):
+                        self.search_stats[key] = max(self.search_stats.get(key, 0), value)  # largest subproblem
+                if fatigue < streamed_best and self.on_improvement is not None:
+                    streamed_best = fatigue
+                    self.on_improvement(self.build_schedule_grid(placements), fatigue, day_fatigue)
+
+        # The serial search keeps the first schedule (in search order) that reaches the optimum
+        for fatigue, placements, day_fatigue in results:
+            if fatigue < self.min_fatigue:
+                self.warm_start_is_best = False
+                self.min_fatigue = fatigue
+                self.best_placements = placements
+                self.best_day_fatigue = day_fatigue
+        self.proven_optimal = not self.search_stopped
+        return self.finish_search()
+
+    def split_subproblems(self, split_depth=None, target=1):
+        """
+        Enumerate the search tree down to split_depth and return the prefixes (lists of placements) in
+        serial search order. Without split_depth, go deeper until there are at least target prefixes.
+        """
+        if split_depth is not None:
+            return self.collect_prefixes(min(split_depth, len(self.tasks)))
+        depth = 1
+        while True:
+            prefixes = self.collect_prefixes(min(depth, len(self.tasks)))
+            if len(prefixes) >= target or depth >= len(self.tasks):
+                return prefixes
+            depth += 1
+
+    def collect_prefixes(self, depth):
+        prefixes = []
+
+        def expand(index):
+            if index == depth:
+                prefixes.append(list(self.placements))
+                return
+            for candidate in self.candidate_assignments(index):
+                undo = self.push_placement(index, *candidate)
+                if not self.dependency_cut_off(index) and not self.is_cut_off(index + 1):
+                    expand(index + 1)
+                self.pop_placement(index, undo)
+
+        expand(0)
+        return prefixes
+
+    def solve_subproblem(self, index, prefix):
+        """
+        Worker side of `minimize_total_fatigue_parallel`: finish the search below one prefix.
+        Only schedules strictly better than the incumbent passed in from the parent are returned.
+        """
+        self.clear_schedule()
+        self.reset_day_tracking()
+        self.best_placements = None
+        self.best_day_fatigue = None
+        self.search_stats = {"nodes": 0, "pruned_by_bound": 0, "pruned_by_dependencies": 0, "pruned_by_warm_start": 0,
+                             "pruned_by_transposition": 0, "transposition_probes": 0, "transposition_hits": 0}
+        self.day_fatigue_cache_counted = self.day_fatigue_cache.cache_info()[:2]
+        for task_id, day_index, start_slot, num_slots in prefix:
+            self.occupy(task_id, day_index, start_slot, num_slots)
+            self.add_to_day(task_id, day_index)
+        self.reset_transposition_table()
+
+        deadline, node_limit = self.subproblem_budget
+        time_limit = None if deadline is None else max(0.0, deadline - time.time())
+        self.start_budget(time_limit, node_limit)
+        self.shared_bound = self.shared_best.value
+        self.backtrack(len(prefix))
+        self.search_stats.update(self.transposition_stats())
+        self.count_day_fatigue_cache()
+
+        fatigue = self.min_fatigue if self.best_placements is not None else float('inf')
+        return index, fatigue, self.best_placements, self.best_day_fatigue, self.search_stats, self.search_stopped
+
+    def start_budget(self, time_limit=None, node_limit=None):
+        self.budget_start = time.perf_counter()
+        self.time_limit = time_limit
+        self.deadline = None if time_limit is None else self.budget_start + time_limit
+        self.node_limit = node_limit
+        self.search_stopped = False
+        self.next_budget_check = 0
+        self.checkpoint_due = False
+        self.next_checkpoint = self.budget_start + self.checkpoint_interval
+
+    def check_budget(self):
+        """
+        Stop the search once the node or time budget is used up, and note when a checkpoint is due.
+        Called every BUDGET_CHECK_INTERVAL nodes.
+        """
+        nodes = self.search_stats["nodes"]
+        if self.node_limit is not None and nodes > self.node_limit:
+            self.search_stopped = True
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.search_stopped = True
+        if self.checkpoint_path is not None and time.perf_counter() >= self.next_checkpoint:
+            self.checkpoint_due = True  # written by run_search_stack once its frames are consistent
+        self.next_budget_check = nodes + BUDGET_CHECK_INTERVAL
+        if self.shared_best is not None:
+            self.shared_bound = self.shared_best.value
+        if self.node_limit is not None:
+            self.next_budget_check = min(self.next_budget_check, self.node_limit + 1)
+
+    def budget_used(self):
+        """
+        Fraction (0 to 1) of the node or time budget used so far, whichever is larger.
+        """
+        used = 0.0
+        if self.node_limit:
+            used = self.search_stats["nodes"] / self.node_limit
+        if self.time_limit:
+            used = max(used, (time.perf_counter() - self.budget_start) / self.time_limit)
+        return min(used, 1.0)
+
+    def local_search(self, strategy="anneal", iterations=20000, time_limit=None, seed=None,
+                     start_temperature=None, tabu_tenure=10, tabu_sample=8, on_improvement=None):
+        """
+        Improve the `greedy_schedule` result by local search; fixed_time tasks never move.
+
+        Moves relocate a floating task to another day or start slot, or swap the days of two floating tasks.
+        Each move is applied and scored incrementally through the per-day tracking, and undone if rejected.
+
+        :param strategy: "anneal" (simulated annealing, geometric cooling over the budget) or "tabu" (move the
+                         best of tabu_sample random tasks to its best other day; a task may not return to a day
+                         it left for tabu_tenure iterations unless that gives a new best schedule).
+        :param iterations: Number of moves (annealing) or neighborhood scans (tabu); search_stats["nodes"].
+        :param time_limit: Stop after this many seconds.
+        :param seed: Seed of the random number generator, for reproducible runs.
+        :param start_temperature: Annealing start temperature, default the mean worsening of sampled moves.
+        :param on_improvement: Called as on_improvement(schedule, min_fatigue, day_fatigue) on every new best.
+        :return: (best_schedule, min_fatigue, best_day_fatigue), the best schedule is never worse than greedy.
+        """
+        if strategy not in ("anneal", "tabu"):
+            raise ValueError(f"未知的局部搜尋策略: {strategy}")
+        self.index_tasks()
+        self.min_fatigue = float('inf')
+        self.best_schedule = None
+        self.best_placements = None
+        self.best_day_fatigue = None
+        self.on_improvement = on_improvement
+        self.proven_optimal = False
+        self.top_k = None
+        self.search_stats = {"nodes": 0, "accepted_moves": 0, "improvements": 0}
+
+        seed_schedule = self.greedy_schedule()
+        if seed_schedule is not None:
+            self.record_best(*seed_schedule)
+            self.search_stats["greedy_fatigue"] = self.min_fatigue
+            table = self.task_table
+            floating = [task_id for task_id in range(len(table)) if table.fixed[task_id] is None]
+            rng = random.Random(seed)
+            self.start_budget(time_limit, iterations)
+            if floating and strategy == "anneal":
+                self.anneal(rng, floating, start_temperature)
+            elif floating:
+                self.tabu_search(rng, floating, tabu_tenure, tabu_sample)
+            self.best_schedule = self.build_schedule_grid(self.best_placements)
+        self.clear_schedule()
+        self.reset_day_tracking()
+        return self.best_schedule, self.min_fatigue, self.best_day_fatigue
+
+    def anneal(self, rng, floating, start_temperature=None):
+        """
+        Simulated annealing part of `local_search`, starting from the current placements.
+        Moves are scored with `move_delta` / `swap_delta` and only applied when accepted.
+        """
+        if start_temperature is None:
+            worsening = [delta for delta in (self.move_delta(rng.choice(floating), rng.randrange(7))
+                                             for _ in range(50)) if delta > 0]
+            start_temperature = sum(worsening) / len(worsening) if worsening else 1.0
+        temperature = start_temperature
+
+        while True:
+            self.search_stats["nodes"] += 1
+            if self.search_stats["nodes"] >= self.next_budget_check:
+                self.check_budget()
+                if self.search_stopped:
+                    break
+                temperature = start_temperature * ANNEAL_FINAL_RATIO ** self.budget_used()
+            task_id = rng.choice(floating)
+            if len(floating) > 1 and rng.random() < 0.3:
+                other_id = rng.choice(floating)
+                if self.task_day[task_id] == self.task_day[other_id]:
+                    continue
+                delta = self.swap_delta(task_id, other_id)
+                if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                    continue
+                if self.swap_days(task_id, other_id) is None:
+                    continue
+            else:
+                # Relocate to a random free start of a random day (its own day: a shift, which costs nothing)
+                day_index = rng.randrange(7)
+                if day_index != self.task_day[task_id]:
+                    if not self.allowed_starts(task_id, day_index):
+                        continue
+                    delta = self.move_delta(task_id, day_index)
+                    if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                        continue
+                if self.relocate(task_id, day_index, rng=rng) is None:
+                    continue
+            self.search_stats["accepted_moves"] += 1
+            self.record_if_better()
+
+    def tabu_search(self, rng, floating, tenure, sample):
+        """
+        Tabu search part of `local_search`, starting from the current placements.
+        Candidate moves are scored with `move_delta` without applying them.
+        """
+        tabu_until = {}  # (task_id, day_index) -> iteration until which the task may not move back there
+        while True:
+            self.search_stats["nodes"] += 1
+            iteration = self.search_stats["nodes"]
+            if iteration >= self.next_budget_check:
+                self.check_budget()
+                if self.search_stopped:
+                    break
+            best_move = None
+            for task_id in rng.sample(floating, min(sample, len(floating))):
+                from_day = self.task_day[task_id]
+                for day_index in range(7):
+                    if day_index == from_day or not self.allowed_starts(task_id, day_index):
+                        continue
+                    delta = self.move_delta(task_id, day_index)
+                    aspiration = self.total_fatigue + delta < self.min_fatigue - BOUND_TOLERANCE
+                    if tabu_until.get((task_id, day_index), 0) >= iteration and not aspiration:
+                        continue
+                    if best_move is None or delta < best_move[0]:
+                        best_move = (delta, task_id, day_index, from_day)
+            if best_move is None:
+                continue
+            _, task_id, day_index, from_day = best_move
+            self.relocate(task_id, day_index)
+            tabu_until[task_id, from_day] = iteration + tenure
+            self.search_stats["accepted_moves"] += 1
+            self.record_if_better()
+
+    def large_neighborhood_search(self, iterations=200, time_limit=None, seed=None, neighborhood_days=(2, 3),
+                                  max_freed_tasks=LNS_MAX_FREED_TASKS, subproblem_node_limit=LNS_SUBPROBLEM_NODE_LIMIT,
+                                  on_improvement=None):
+        """
+        Improve the `greedy_schedule` result by large neighborhood search, for task counts the exact search
+        cannot finish. Every iteration frees the floating tasks of a few random days of the best schedule and
+        re-solves how they are spread over those days exactly with the backtracking search, every other task
+        pinned in place (see `solve_neighborhood`). Only improvements are accepted.
+
+        :param iterations: Number of sub-problems to solve; search_stats["nodes"].
+        :param time_limit: Stop after this many seconds (a running sub-problem gets what is left of it).
+        :param seed: Seed of the random number generator, for reproducible runs.
+        :param neighborhood_days: Numbers of days to free, one is picked at random every iteration.
+        :param max_freed_tasks: Free at most this many tasks (a random sample of the days' floating tasks).
+        :param subproblem_node_limit: Node budget of each sub-problem; a sub-problem that runs out of it
+                                      still returns the best schedule it found.
+        :param on_improvement: Called as on_improvement(schedule, min_fatigue, day_fatigue) on every new best.
+        :return: (best_schedule, min_fatigue, best_day_fatigue), the best schedule is never worse than greedy.
+        """
+        if not neighborhood_days or any(not isinstance(days, int) or not 1 <= days <= 7 for days in neighborhood_days):
+            raise ValueError("neighborhood_days 必須是 1 到 7 之間的整數。")
+        if not isinstance(max_freed_tasks, int) or max_freed_tasks < 1:
+            raise ValueError("max_freed_tasks 必須是正整數。")
+        self.index_tasks()
+        self.min_fatigue = float('inf')
+        self.best_schedule = None
+        self.best_placements = None
+        self.best_day_fatigue = None
+        self.on_improvement = on_improvement
+        self.proven_optimal = False
+        self.top_k = None
+        self.search_stats = {"nodes": 0, "improvements": 0, "subproblem_nodes": 0, "subproblems_proven": 0}
+
+        seed_schedule = self.greedy_schedule()
+        if seed_schedule is not None:
+            self.record_best(*seed_schedule)
+            self.search_stats["greedy_fatigue"] = self.min_fatigue
+            table = self.task_table
+            floating = [task_id for task_id in range(len(table)) if table.fixed[task_id] is None]
+            rng = random.Random(seed)
+            neighborhood = self.neighborhood_scheduler()
+            self.start_budget(time_limit, iterations)
+            while floating:
+                # Every iteration is a whole sub-problem, so the budget is checked each time
+                self.search_stats["nodes"] += 1
+                self.check_budget()
+                if self.search_stopped:
+                    break
+                busy_days = sorted({self.task_day[task_id] for task_id in floating})
+                days = rng.sample(busy_days, min(rng.choice(neighborhood_days), len(busy_days)))
+                freed = [task_id for task_id in floating if self.task_day[task_id] in days]
+                freed = rng.sample(freed, min(max_freed_tasks, len(freed)))
+                remaining = None if self.deadline is None else max(0.0, self.deadline - time.perf_counter())
+                placements = self.solve_neighborhood(freed, days, subproblem_node_limit, remaining, neighborhood)
+                if placements is None:
+                    continue
+                self.load_placements(placements)
+                if self.total_fatigue < self.min_fatigue - BOUND_TOLERANCE:
+                    self.search_stats["improvements"] += 1
+                    self.record_best(list(self.placements), self.total_fatigue, list(self.day_fatigue))
+                else:
+                    self.load_placements(self.best_placements)
+            self.best_schedule = self.build_schedule_grid(self.best_placements)
+        self.clear_schedule()
+        self.reset_day_tracking()
+        return self.best_schedule, self.min_fatigue, self.best_day_fatigue
+
+    def neighborhood_scheduler(self):
+        """
+        Scheduler for the sub-problems of `large_neighborhood_search`, built once per run.
+
+        :return: (scheduler, copies): the scheduler holds a copy of every task dict, copies[task_id] is the one
+                 of task_id here. `solve_neighborhood` pins or frees the copies before each search.
+        """
+        subproblem = Scheduler(self.start_time, self.end_time, self.interval_minutes, self.fatigue_calculation)
+        copies = [dict(task) for task in self.task_table]
+        subproblem.add_tasks(copies)
+        return subproblem, copies
+
+    def solve_neighborhood(self, freed, days, node_limit=None, time_limit=None, neighborhood=None):
+        """
+        Exact sub-problem of `large_neighborhood_search`: where on the given days can the freed tasks go, every
+        other placed task pinned as a fixed_time task at its current slot, so the whole schedule beats
+        min_fatigue? Solved by `backtrack` on a separate Scheduler whose search_days are these days, with
+        min_fatigue as the incumbent.
+
+        :param freed: Task ids of placed floating tasks that may move.
+        :param days: Day indexes the freed tasks may move to.
+        :param neighborhood: `neighborhood_scheduler` result to reuse (the search resets its state), by default
+                             a new one.
+        :return: Placements of every task (task ids of this scheduler) of the best schedule found, or None if
+                 none beats min_fatigue.
+        """
+        freed = set(freed)
+        table = self.task_table
+        subproblem, copies = neighborhood or self.neighborhood_scheduler()
+        origin = {}  # id() of the sub-problem's task dicts -> task id here
+        for task_id, day_index, start_slot, _ in self.placements:
+            task = copies[task_id]
+            if task_id in freed:
+                task["fixed_time"] = table[task_id].get("fixed_time")
+            else:
+                # The start as minutes after start_time, which fixed_start_slot turns back into start_slot exactly
+                task["fixed_time"] = (self.days[day_index], self.start_time, start_slot * self.interval_minutes)
+            origin[id(task)] = task_id
+
+        subproblem.prepare_search(warm_start=False)
+        subproblem.search_days = tuple(sorted(days))
+        if subproblem.use_bound:
+            subproblem.prepare_lower_bound()  # with the freed tasks' days narrowed down
+        subproblem.min_fatigue = self.min_fatigue - BOUND_TOLERANCE  # only strict improvements are recorded
+        subproblem.start_budget(time_limit, node_limit)
+        subproblem.backtrack(0)
+        self.search_stats["subproblem_nodes"] += subproblem.search_stats["nodes"]
+        if not subproblem.search_stopped:
+            self.search_stats["subproblems_proven"] += 1
+        if subproblem.best_placements is None:
+            return None
+        table = subproblem.task_table
+        return [(origin[id(table[task_id])], day_index, start_slot, num_slots)
+                for task_id, day_index, start_slot, num_slots in subproblem.best_placements]
+
+    def record_if_better(self):
+        if self.total_fatigue < self.min_fatigue - BOUND_TOLERANCE:
+            self.search_stats["improvements"] += 1
+            self.record_best(list(self.placements), self.total_fatigue, list(self.day_fatigue))
+
+    def relocate(self, task_id, day_index, start_slot=None, rng=None):
+        """
+        Move a placed task to day_index, at start_slot if given, else at its first free start or (with rng)
+        a random free start.
+
+        :return: Function undoing the move, or None if the task does not fit there (nothing changed).
+        """
+        _, from_day, from_start, num_slots = self.unplace(self.position_of(task_id))
+        starts = self.allowed_starts(task_id, day_index)
+        if start_slot is not None:
+            starts &= 1 << start_slot if 0 <= start_slot <= self.num_intervals_per_day - num_slots else 0
+        if not starts:
+            self.place(task_id, from_day, from_start)
+            return None
+        if start_slot is None and rng is None:
+            start_slot = (starts & -starts).bit_length() - 1
+        elif start_slot is None:
+            start_slot = rng.choice([slot for slot in range(starts.bit_length()) if starts >> slot & 1])
+        self.place(task_id, day_index, start_slot)
+
+        def undo():
+            self.unplace(self.position_of(task_id))
+            self.place(task_id, from_day, from_start)
+        return undo
+
+    def swap_days(self, task_id, other_id):
+        """
+        Exchange the days of two placed tasks (each at the first free start of its new day).
+
+        :return: Function undoing the swap, or None if the tasks share a day or do not fit (nothing changed).
+        """
+        if task_id == other_id:
+            return None
+        first = self.unplace(self.position_of(task_id))
+        second = self.unplace(self.position_of(other_id))
+        if first[1] != second[1]:
+            first_starts = self.allowed_starts(task_id, second[1])
+            if first_starts:
+                self.place(task_id, second[1], (first_starts & -first_starts).bit_length() - 1)
+                second_starts = self.allowed_starts(other_id, first[1])
+                if second_starts:
+                    self.place(other_id, first[1], (second_starts & -second_starts).bit_length() - 1)
+
+                    def undo():
+                        self.unplace(self.position_of(task_id))
+                        self.unplace(self.position_of(other_id))
+                        self.place(task_id, first[1], first[2])
+                        self.place(other_id, second[1], second[2])
+                    return undo
+                self.unplace(len(self.placements) - 1)
+        self.place(task_id, first[1], first[2])
+        self.place(other_id, second[1], second[2])
+        return None
+
+    def load_placements(self, placements=None):
+        """
+        Make a list of placements (default best_placements) the current state, so moves can be scored with
+        `move_delta` / `swap_delta` / `remove_delta` and applied with `move_task` / `swap_tasks` / `remove_task`.
+        Task ids refer to the current `task_table`.
+
+        :return: Total fatigue of the loaded schedule.
+        """
+        if placements is None:
+            placements = self.best_placements or []
+        self.clear_schedule()
+        self.reset_day_tracking()
+        for task_id, day_index, start_slot, _ in placements:
+            self.place(task_id, day_index, start_slot)
+        return self.total_fatigue
+
+    def shares_name_on_day(self, task_id, day_index):
+        """
+        Whether another placement on the day has the same task name (it then keeps the name's fatigue).
+        """
+        table = self.task_table
+        if table.unique_names:
+            return False
+        name_tasks = self.day_name_tasks[day_index].get(table.name_bit[task_id], ())
+        return len(name_tasks) > 1 or (len(name_tasks) == 1 and name_tasks[0] != task_id)
+
+    def day_fatigue_change(self, day_index, removed=None, added=None):
+        """
+        Change of a day's fatigue if the placed task `removed` left it and/or the task `added` joined it,
+        computed from the day's fatigue and difficulty sums (see `remove_from_day` for repeated names).
+        """
+        table = self.task_table
+        task_bits = self.day_task_bits[day_index]
+        fatigue_sum = self.day_fatigue_sum[day_index]
+        difficulty_sum = self.day_difficulty_sum[day_index]
+        counting = None  # with repeated names: the task counting for added's name on the day
+        if added is not None and not table.unique_names and task_bits & table.name_bit[added]:
+            counting = next((task_id for task_id in self.day_name_tasks[day_index][table.name_bit[added]]
+                            if task_id != removed), None)
+        if removed is not None and self.shares_name_on_day(removed, day_index):
+            name_tasks = self.day_name_tasks[day_index][table.name_bit[removed]]
+            if name_tasks[0] == removed:
+                fatigue_sum += table.fatigue_of[name_tasks[1]] - table.fatigue_of[removed]
+                difficulty_sum += table.difficulty_of[name_tasks[1]] - table.difficulty_of[removed]
+        elif removed is not None:
+            task_bits &= ~table.name_bit[removed]
+            fatigue_sum -= table.fatigue_of[removed]
+            difficulty_sum -= table.difficulty_of[removed]
+        if added is not None and not task_bits & table.name_bit[added]:
+            task_bits |= table.name_bit[added]
+            fatigue_sum += table.fatigue_of[added]
+            difficulty_sum += table.difficulty_of[added]
+        elif counting is not None and added < counting:
+            fatigue_sum += table.fatigue_of[added] - table.fatigue_of[counting]
+            difficulty_sum += table.difficulty_of[added] - table.difficulty_of[counting]
+        new_day_fatigue = fatigue_sum * (1 + difficulty_sum) if task_bits else 0.0
+        return new_day_fatigue - self.day_fatigue[day_index]
+
+    def remove_delta(self, task_id):
+        """
+        Change in total fatigue if a placed task were removed from the schedule.
+        """
+        return self.day_fatigue_change(self.task_day[task_id], removed=task_id)
+
+    def move_delta(self, task_id, day_index):
+        """
+        Change in total fatigue if a placed task were moved to another day (where it starts does not matter).
+        """
+        from_day = self.task_day[task_id]
+        if from_day == day_index:
+            return 0.0
+        return self.day_fatigue_change(from_day, removed=task_id) + self.day_fatigue_change(day_index, added=task_id)
+
+    def swap_delta(self, task_id, other_id):
+        """
+        Change in total fatigue if two placed tasks exchanged their days.
+        """
+        first_day, second_day = self.task_day[task_id], self.task_day[other_id]
+        if first_day == second_day:
+            return 0.0
+        return (self.day_fatigue_change(first_day, removed=task_id, added=other_id)
+                + self.day_fatigue_change(second_day, removed=other_id, added=task_id))
+
+    def move_task(self, task_id, day_index, start_slot=None):
+        """
+        Move a placed floating task to day_index (at start_slot, default the first free start) and record
+        the move for `rollback`.
+
+        :return: Change in total fatigue.
+        """
+        if self.task_table.fixed[task_id] is not None:
+            raise ValueError("固定時間的任務不能移動。")
+        before = self.total_fatigue
+        undo = self.relocate(task_id, day_index, start_slot)
+        if undo is None:
+            raise ValueError("該時段沒有足夠的空閒時間。")
+        self.move_log.append(undo)
+        return self.total_fatigue - before
+
+    def swap_tasks(self, task_id, other_id):
+        """
+        Exchange the days of two placed floating tasks (see `swap_days`) and record the swap for `rollback`.
+
+        :return: Change in total fatigue.
+        """
+        if self.task_table.fixed[task_id] is not None or self.task_table.fixed[other_id] is not None:
+            raise ValueError("固定時間的任務不能移動。")
+        before = self.total_fatigue
+        undo = self.swap_days(task_id, other_id)
+        if undo is None:
+            raise ValueError("兩個任務無法交換日期。")
+        self.move_log.append(undo)
+        return self.total_fatigue - before
+
+    def remove_task(self, task_id):
+        """
+        Take a placed task off the schedule and record the removal for `rollback`.
+
+        :return: Change in total fatigue.
+        """
+        before = self.total_fatigue
+        _, day_index, start_slot, _ = self.unplace(self.position_of(task_id))
 
-        task = self.tasks[index]
-        possible_assignments = self.get_possible_assignments(task)
+        def undo():
+            self.place(task_id, day_index, start_slot)
+        self.move_log.append(undo)
+        return self.total_fatigue - before
+
+    def rollback(self, steps=1):
+        """
+        Undo the last `steps` moves applied with move_task / swap_tasks / remove_task.
+        """
+        for _ in range(min(steps, len(self.move_log))):
+            self.move_log.pop()()
+
+    def greedy_optimize(self, strategy="min_fatigue"):
+        """
+        Schedule the tasks with `greedy_schedule` only (no exhaustive search).
+
+        :param strategy: Placement strategy, one of PLACEMENT_STRATEGIES (see `choose_slot`).
+        """
+        if strategy not in PLACEMENT_STRATEGIES:
+            raise ValueError(f"未知的排程策略: {strategy}")
+        self.index_tasks()
+
+        self.min_fatigue = float('inf')
+        self.best_schedule = None
+        self.best_placements = None
+        self.best_day_fatigue = None
+        seed = self.greedy_schedule(strategy)
+        if seed is not None:
+            self.best_placements, self.min_fatigue, self.best_day_fatigue = seed
+            self.best_schedule = self.build_schedule_grid(self.best_placements)
+        self.clear_schedule()
+        self.reset_day_tracking()
+        return self.best_schedule, self.min_fatigue
+
+    def greedy_schedule(self, strategy="min_fatigue"):
+        """
+        Fast heuristic schedule: fixed_time tasks first, then the most tiring tasks, each placed by
+        `choose_slot` (by default on the day where it adds the least fatigue). With "min_fatigue", floating
+        tasks are then re-inserted one at a time while that still lowers the total.
+        Prerequisites are placed before their dependents, which then start after them.
+
+        Expects `task_table` to be up to date and leaves the placements in the current state.
+        :return: (placements, total_fatigue, day_fatigue), or None if some task could not be placed.
+        """
+        self.clear_schedule()
+        self.reset_day_tracking()
+
+        table = self.task_table
+        order = sorted(range(len(table)), key=lambda task_id: (
+            table.fixed[task_id] is None, -table.fatigue_of[task_id] * (1 + table.difficulty_of[task_id])))
+        if table.has_dependencies:
+            order = topological_order(order, table.prerequisites, [task["name"] for task in table])
+        for task_id in order:
+            if not self.place_greedily(task_id, strategy):
+                return None
+
+        floating = [task_id for task_id in order if table.fixed[task_id] is None]
+        improved = strategy == "min_fatigue"
+        while improved:
+            improved = False
+            for task_id in floating:
+                before = self.total_fatigue
+                _, day_index, start_slot, _ = self.unplace(self.position_of(task_id))
+                self.place_greedily(task_id)  # the slot it just left is still available
+                if self.total_fatigue < before - BOUND_TOLERANCE:
+                    improved = True
+                elif self.total_fatigue > before + BOUND_TOLERANCE:
+                    # Only keep strict improvements, so the loop ends
+                    self.unplace(self.position_of(task_id))
+                    self.place(task_id, day_index, start_slot)
+
+        return list(self.placements), self.total_fatigue, list(self.day_fatigue)
+
+    def place_greedily(self, task_id, strategy="min_fatigue"):
+        """
+        Place a task at its fixed_time, or where `choose_slot` puts it. Returns False if it does not fit.
+        """
+        num_slots = self.task_table.slots_of[task_id]
+        fixed_position = self.task_table.fixed[task_id]
+        if fixed_position is not None:
+            day_index, start_slot = fixed_position
+            if start_slot < 0 or start_slot + num_slots > self.num_intervals_per_day:
+                return False
+            if not self.allowed_starts(task_id, day_index) >> start_slot & 1:
+                return False
+        else:
+            slot = self.choose_slot(task_id, strategy)
+            if slot is None:
+                return False
+            day_index, start_slot = slot
+
+        self.occupy(task_id, day_index, start_slot, num_slots)
+        self.add_to_day(task_id, day_index)
+        return True
+
+    def choose_slot(self, task_id, strategy="min_fatigue"):
+        """
+        (day_index, start_slot) for a floating task, or None if no day has room. Ties go to the earliest day.
+        Only starts inside the task's `dependency_window` count.
+
+        :param strategy: "min_fatigue": the day where the task adds the least fatigue, first free run.
+                         "first_fit": the first day with room, first free run.
+                         "best_fit": the tightest free run of the week that holds the task.
+                         "worst_fit": the longest free run of the week (spreads the load over the days).
+        """
+        num_slots = self.task_table.slots_of[task_id]
+        window = self.dependency_window(task_id) if self.task_table.has_dependencies else None
+        best = None
+        for day_index in range(7):
+            starts = self.allowed_starts(task_id, day_index, window)
+            if not starts:
+                continue
+            if strategy in ("min_fatigue", "first_fit"):
+                start_slot = (starts & -starts).bit_length() - 1
+                if strategy == "first_fit":
+                    return day_index, start_slot
+                key = self.marginal_day_fatigue(task_id, day_index)
+            else:
+                # Free runs holding the task, each with its first allowed start
+                fitting = []
+                for run_start, length in self.free_intervals(day_index):
+                    inside = starts & (((1 << max(length - num_slots + 1, 0)) - 1) << run_start)
+                    if inside:
+                        fitting.append((length, (inside & -inside).bit_length() - 1))
+                if not fitting:
+                    continue
+                if strategy == "best_fit":
+                    key, start_slot = min(fitting)
+                else:
+                    length, start_slot = min(fitting, key=lambda interval: (-interval[0], interval[1]))
+                    key = -length
+            if best is None or key < best[0]:
+                best = (key, day_index, start_slot)
+        return None if best is None else best[1:]
+
+    def marginal_day_fatigue(self, task_id, day_index):
+        """
+        Increase in a day's fatigue if the task were added to it.
+        """
+        table = self.task_table
+        if self.day_task_bits[day_index] & table.name_bit[task_id]:
+            return self.day_fatigue_change(day_index, added=task_id) if not table.uniform_names else 0.0
+        fatigue_sum = self.day_fatigue_sum[day_index] + table.fatigue_of[task_id]
+        difficulty_sum = self.day_difficulty_sum[day_index] + table.difficulty_of[task_id]
+        return fatigue_sum * (1 + difficulty_sum) - self.day_fatigue[day_index]
+
+    def reset_day_tracking(self):
+        # day_task_bits: bitset of the task name ids on each day; day_task_ids: of the task ids, which is the
+        # key of the day's fatigue in day_fatigue_cache
+        self.day_task_bits = [0 for _ in range(7)]
+        self.day_task_ids = [0 for _ in range(7)]
+        # Only with repeated names: name bit -> sorted ids of the tasks with that name on the day.
+        # The first (lowest) one's attributes are in the day's sums.
+        self.day_name_tasks = [{} for _ in range(7)]
+        self.day_difficulty_sum = [0 for _ in range(7)]
+        self.day_fatigue_sum = [0.0 for _ in range(7)]
+        self.day_fatigue = [0.0 for _ in range(7)]
+        self.total_fatigue = 0.0
+
+    def add_to_day(self, task_id, day_index):
+        """
+        Update the per-day fatigue tracking for a task placed on day_index.
+        Returns False if the day already had a task with this name (which keeps counting, unless this task
+        has a lower id).
+        """
+        table = self.task_table
+        name_bit = table.name_bit[task_id]
+        self.day_task_ids[day_index] |= 1 << task_id
+        if self.day_task_bits[day_index] & name_bit:
+            name_tasks = self.day_name_tasks[day_index][name_bit]
+            bisect.insort(name_tasks, task_id)
+            if name_tasks[0] == task_id:
+                self.update_day_sums(day_index,
+                                     table.fatigue_of[task_id] - table.fatigue_of[name_tasks[1]],
+                                     table.difficulty_of[task_id] - table.difficulty_of[name_tasks[1]])
+            return False
+        self.day_task_bits[day_index] |= name_bit
+        if not table.unique_names:
+            self.day_name_tasks[day_index][name_bit] = [task_id]
+        self.update_day_sums(day_index, table.fatigue_of[task_id], table.difficulty_of[task_id])
+        return True
+
+    def remove_from_day(self, task_id, day_index):
+        """
+        Revert `add_to_day`, for every task taken off a day. If it counted for its name there and another task
+        with the name stays, the next lowest id's attributes take over.
+        """
+        table = self.task_table
+        name_bit = table.name_bit[task_id]
+        self.day_task_ids[day_index] &= ~(1 << task_id)
+        if not table.unique_names:
+            name_tasks = self.day_name_tasks[day_index][name_bit]
+            if len(name_tasks) > 1:
+                first = name_tasks[0]
+                name_tasks.remove(task_id)
+                if first == task_id:
+                    self.update_day_sums(day_index,
+                                         table.fatigue_of[name_tasks[0]] - table.fatigue_of[task_id],
+                                         table.difficulty_of[name_tasks[0]] - table.difficulty_of[task_id])
+                return
+            del self.day_name_tasks[day_index][name_bit]
+        self.day_task_bits[day_index] &= ~name_bit
+        self.update_day_sums(day_index, -table.fatigue_of[task_id], -table.difficulty_of[task_id])
+
+    def update_day_sums(self, day_index, fatigue_change, difficulty_change):
+        """
+        Add to a day's fatigue and difficulty sums (for the lower bound and the move deltas) and look the day's
+        fatigue up in `day_fatigue_cache` under its task set.
+        """
+        if self.day_task_bits[day_index]:
+            self.day_fatigue_sum[day_index] += fatigue_change
+            self.day_difficulty_sum[day_index] += difficulty_change
+        else:
+            # Start the next sums from exact zeros
+            self.day_fatigue_sum[day_index] = 0.0
+            self.day_difficulty_sum[day_index] = 0
+        old_day_fatigue = self.day_fatigue[day_index]
+        self.day_fatigue[day_index] = self.day_fatigue_cache(self.day_task_ids[day_index])
+        self.total_fatigue += self.day_fatigue[day_index] - old_day_fatigue
+
+    def prepare_lower_bound(self):
+        """
+        Precompute, for every search depth, the remaining tasks that the lower bound has to account for.
+        A task name that appears again later is only counted once (duplicates share a day's fatigue), with the
+        least fatigue and difficulty of its tasks on any of their days (see `merge_bound_entry`).
+        """
+        table = self.task_table
+        self.bound_entries = []
+        for task_id in range(len(table)):
+            if table.fixed[task_id] is not None:
+                day_options = (table.fixed[task_id][0],)
+            else:
+                day_options = self.search_days
+            self.bound_entries.append((table.name_bit[task_id], table.fatigue_of[task_id],
+                                       table.difficulty_of[task_id], day_options))
+
+        remaining = []
+        name_position = {}  # name bit -> position of its entry in remaining
+        self.bound_tasks = [None] * (len(table) + 1)
+        self.bound_tasks[len(table)] = ()
+        for task_id in range(len(table) - 1, -1, -1):
+            self.merge_bound_entry(remaining, name_position, self.bound_entries[task_id])
+            self.bound_tasks[task_id] = tuple(remaining)
+
+    def merge_bound_entry(self, remaining, name_position, entry):
+        """
+        Add a task's bound entry to remaining, or merge it into the entry of its name. Which of the tasks sharing
+        a name counts on a day depends on which of them end up there, so the merged entry takes the least fatigue
+        and difficulty on the days of either; with uniform_names they are the same.
+        """
+        name_bit = entry[0]
+        if name_bit not in name_position:
+            name_position[name_bit] = len(remaining)
+            remaining.append(entry)
+        elif not self.task_table.uniform_names:
+            position = name_position[name_bit]
+            _, fatigue, difficulty, day_options = remaining[position]
+            remaining[position] = (name_bit, min(fatigue, entry[1]), min(difficulty, entry[2]),
+                                   tuple(sorted(set(day_options) | set(entry[3]))))
+
+    def unplaced_bound_tasks(self):
+        """
+        `bound_tasks` entries of the unplaced tasks, once per task name, for the forward checking search
+        where the unplaced tasks are not a suffix of the search order.
+        """
+        remaining = []
+        name_position = {}
+        for task_id, entry in enumerate(self.bound_entries):
+            if task_id not in self.task_day:
+                self.merge_bound_entry(remaining, name_position, entry)
+        return remaining
+
+    def remaining_fatigue_lower_bound(self, index):
+        """
+        Admissible lower bound on the fatigue that tasks[index:] (with forward_checking: the unplaced tasks)
+        will still add.
+
+        Putting a task (fatigue f, difficulty d) on a day with sums F, D raises that day's fatigue by
+        f * (1 + D + d) + F * d. Sums only grow as more tasks are placed, so the cheapest such increase
+        under the current sums can never overestimate what the task will really cost.
+        """
+        bound = 0.0
+        task_bits = self.day_task_bits
+        difficulty_sum = self.day_difficulty_sum
+        fatigue_sum = self.day_fatigue_sum
+        remaining = self.unplaced_bound_tasks() if self.forward_checking else self.bound_tasks[index]
+        for name_bit, fatigue, difficulty, day_options in remaining:
+            cheapest = float('inf')
+            for day_index in day_options:
+                if task_bits[day_index] & name_bit:
+                    cheapest = 0.0
+                    break
+                cost = fatigue * (1 + difficulty_sum[day_index] + difficulty) + fatigue_sum[day_index] * difficulty
+                if cost < cheapest:
+                    cheapest = cost
+            bound += cheapest
+        return bound
+
+    def backtrack(self, index, task_id=None):
+        """
+        Backtracking function to assign tasks and minimize fatigue, from the current placements.
+
+        The search runs on an explicit stack rather than recursing once per task, so the number of tasks is
+        not bounded by Python's recursion limit. A frame is [index, task_id, candidates, next_candidate, undo]:
+        the number of tasks placed before it, the task it places, that task's candidate placements (None until
+        the node is opened), the position of the next one to try and the placement currently applied (None
+        between two candidates). A budget stop takes the placements off the grid again but keeps the frames,
+        see `resume_search`. With a checkpoint_path the frames are also written to disk (see `write_checkpoint`).
+
+        :param index: Number of tasks placed so far.
+        :param task_id: Task to place at this node. By default the next one in search order; with
+                        forward_checking the parent frame picks it (see `most_constrained_task`).
+        """
+        self.search_stats["nodes"] += 1
+        if self.search_stats["nodes"] >= self.next_budget_check:
+            self.check_budget()
+        self.search_stack = [[index, task_id, None, 0, None]]
+        self.run_search_stack()
+
+    def run_search_stack(self):
+        """
+        Main loop of `backtrack`: open the top frame, or undo its last placement and apply the next candidate
+        (pushing the child node unless it is cut), or pop the frame once every candidate was tried.
+        """
+        stack = self.search_stack
+        stats = self.search_stats
+        use_transpositions = self.transposition_table is not None
+        num_tasks = len(self.tasks)
+        dependents = self.task_table.dependents
+        while stack and not self.search_stopped:
+            frame = stack[-1]
+            index, task_id, candidates, position, undo = frame
+            if candidates is None:
+                # Open the node
+                if index >= num_tasks:
+                    stack.pop()
+                    if self.total_fatigue < self.min_fatigue:
+                        self.warm_start_is_best = False
+                        self.record_best(list(self.placements), self.total_fatigue, list(self.day_fatigue))  # 保存當前每天的疲勞值
+                    continue
+                if use_transpositions and self.transposition_cut_off(index):
+                    stack.pop()
+                    continue
+                if task_id is None:
+                    frame[1] = task_id = index  # task ids follow the search order, see prepare_search
+                frame[2] = candidates = self.candidate_assignments(task_id)
+            elif undo is not None:
+                # Undo the assignment
+                self.pop_placement(task_id, undo)
+                frame[4] = None
+            if position == len(candidates):
+                stack.pop()
+                if use_transpositions:
+                    self.store_transposition(index)
+                continue
 
-        for day_index, start_slot, num_slots in possible_assignments:
             # Assign the task to the schedule
-            for slot in range(start_slot, start_slot + num_slots):
-                self.schedule[day_index][slot] = task
+            frame[3] = position + 1
+            frame[4] = self.push_placement(task_id, *candidates[position])
+
+            if dependents[task_id] and self.dependency_cut_off(task_id):
+                stats["pruned_by_dependencies"] += 1
+                continue
+            if self.is_cut_off(index + 1):
+                stats["pruned_by_bound"] += 1
+                if self.warm_start_is_best:
+                    stats["pruned_by_warm_start"] += 1
+                continue
+            next_task = None
+            if self.forward_checking and index + 1 < num_tasks:
+                next_task = self.most_constrained_task()
+                if next_task is None:
+                    stats["pruned_by_forward_check"] += 1
+                    continue
+            stats["nodes"] += 1
+            stack.append([index + 1, next_task, None, 0, None])
+            if stats["nodes"] >= self.next_budget_check:
+                self.check_budget()
+                if self.checkpoint_due:
+                    self.write_checkpoint()
+
+        if self.checkpoint_path is not None:
+            self.write_checkpoint()
+        if self.search_stopped:
+            # Take the placements of the frames off the grid again
+            for _, task_id, _, _, undo in reversed(stack):
+                if undo is not None:
+                    self.pop_placement(task_id, undo)
+
+    def push_placement(self, task_id, day_index, start_slot, num_slots):
+        """
+        Apply one placement of the search: `occupy`, `add_to_day` and, with a transposition table, the state hash.
 
-            # Determine if the task is new for the day
-            is_new_task_for_day = task["name"] not in self.day_unique_tasks[day_index]
+        :return: The undo record of a search frame, (day_index, start_slot, num_slots, is_new_task_for_day,
+                 saved_hash); see `pop_placement`.
+        """
+        self.occupy(task_id, day_index, start_slot, num_slots)
+        is_new_task_for_day = self.add_to_day(task_id, day_index)
+        saved_hash = None
+        if self.transposition_table is not None:
+            saved_hash = (self.placed_hash, self.layout_hash)
+            self.hash_placement(task_id, day_index, start_slot, num_slots, is_new_task_for_day)
+        return day_index, start_slot, num_slots, is_new_task_for_day, saved_hash
+
+    def pop_placement(self, task_id, undo):
+        """
+        Revert the `push_placement` that returned undo, which must be the most recent placement.
+        """
+        self.release()
+        self.remove_from_day(task_id, undo[0])
+        if undo[4] is not None:
+            self.placed_hash, self.layout_hash = undo[4]
 
-            if is_new_task_for_day:
-                # Update per-day tracking
-                self.day_unique_tasks[day_index].add(task["name"])
-                self.day_difficulty_sum[day_index] += task["difficulty"]
-                self.day_fatigue_sum[day_index] += task["fatigue"]
-                old_day_fatigue = self.day_fatigue[day_index]
-                self.day_fatigue[day_index] = self.day_fatigue_sum[day_index] * (1 + self.day_difficulty_sum[day_index])
-                self.total_fatigue += self.day_fatigue[day_index] - old_day_fatigue
-
-            # Prune if current total fatigue exceeds the minimum found
-            if self.total_fatigue < self.min_fatigue:
-                self.backtrack(index + 1)
-
-            # Undo the assignment
-            for slot in range(start_slot, start_slot + num_slots):
-                self.schedule[day_index][slot] = None
+    def resume_search(self, time_limit=None, node_limit=None):
+        """
+        Continue the last `minimize_total_fatigue` backtracking search after it stopped on its budget, from the
+        frames it left on the search stack. The search then returns what it would have returned without the
+        stop (given enough budget). After a search that finished, this just returns its result again.
+
+        :param time_limit: Stop again after this many seconds.
+        :param node_limit: Stop again after visiting this many more search nodes.
+        :return: The same as `minimize_total_fatigue`.
+        """
+        if self.search_stopped and not self.search_stack:
+            raise ValueError("只有回溯搜尋可以接續 (不含平行搜尋)。")
+        for frame in self.search_stack:
+            if frame[4] is not None:
+                frame[4] = self.push_placement(frame[1], *frame[4][:3])
+        if self.top_k is not None:
+            # finish_search reported the best schedule, the search prunes against the top_k-th best
+            self.min_fatigue = -self.top_heap[0][0] if len(self.top_heap) == self.top_k else float('inf')
+        return self.continue_search(time_limit, node_limit)
+
+    def continue_search(self, time_limit=None, node_limit=None):
+        """
+        Run the frames on the search stack with a new budget and return the result like `minimize_total_fatigue`.
+        """
+        self.start_budget(time_limit, None if node_limit is None else self.search_stats["nodes"] + node_limit)
+        self.run_search_stack()
+        self.search_stats.update(self.transposition_stats())
+        self.proven_optimal = not self.search_stopped
+        result = self.finish_search()
+        return result if self.top_k is None else self.top_schedules
+
+    def checkpoint_tasks(self):
+        """
+        What a checkpoint records of the tasks in search order, to check it is resumed on the same problem.
+        """
+        table = self.task_table
+        return [[task["name"], float(table.fatigue_of[task_id]), float(table.difficulty_of[task_id]),
+                 table.slots_of[task_id], None if table.fixed[task_id] is None else list(table.fixed[task_id])]
+                for task_id, task in enumerate(table)]
+
+    def write_checkpoint(self):
+        """
+        Write the state of the backtracking search to checkpoint_path as JSON: the search options, the tasks,
+        the incumbent (the top_k heap in top_k mode), search_stats and the frames of the search stack. A frame
+        is stored as [index, task_id, opened, next_candidate, placement]; its candidates are recomputed on
+        resume, and the transposition table is not stored (it starts empty again). The file is replaced
+        atomically, so a crash while writing keeps the previous checkpoint.
+        """
+        self.count_day_fatigue_cache()
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "options": self.search_options,
+            "tasks": self.checkpoint_tasks(),
+            "min_fatigue": self.min_fatigue,
+            "best_placements": self.best_placements,
+            "best_day_fatigue": self.best_day_fatigue,
+            "warm_start_is_best": self.warm_start_is_best,
+            "search_stats": self.search_stats,
+            "frames": [[index, task_id, candidates is not None, position, None if undo is None else undo[:3]]
+                       for index, task_id, candidates, position, undo in self.search_stack],
+        }
+        if self.top_k is not None:
+            checkpoint["top"] = [[-negative_fatigue, -negative_found, placements, day_fatigue]
+                                 for negative_fatigue, negative_found, _, placements, day_fatigue in self.top_heap]
+            checkpoint["top_found"] = self.top_found
+            checkpoint["top_best_fatigue"] = self.top_best_fatigue
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, separators=(",", ":"), default=float)  # default: NumPy scalars
+        os.replace(temporary_path, self.checkpoint_path)
+        self.checkpoint_due = False
+        self.next_checkpoint = time.perf_counter() + self.checkpoint_interval
+
+    def resume_from_checkpoint(self, checkpoint_path, time_limit=None, node_limit=None, on_improvement=None,
+                               checkpoint_interval=CHECKPOINT_INTERVAL):
+        """
+        Continue a `minimize_total_fatigue` backtracking search from the file written with checkpoint_path,
+        e.g. after the process was restarted. The scheduler must hold the same tasks and fatigue function as
+        the one that wrote it. The search then returns what it would have returned without the restart (given
+        enough budget), and keeps writing checkpoints to the same file.
+
+        :param time_limit: Stop again after this many seconds.
+        :param node_limit: Stop again after visiting this many more search nodes.
+        :param on_improvement: As for `minimize_total_fatigue`, called for schedules better than the checkpoint's.
+        :param checkpoint_interval: Seconds between two checkpoints.
+        :return: The same as `minimize_total_fatigue`.
+        """
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("不支援的檢查點格式。")
+        options = checkpoint["options"]
+        self.prepare_search(options["use_bound"], options["break_symmetry"], False, on_improvement,
+                            options["forward_checking"], options["transposition_size"], options["top_k"])
+        if checkpoint["tasks"] != self.checkpoint_tasks():
+            raise ValueError("檢查點的任務與目前的任務不同。")
+
+        # The incumbent
+        self.search_stats = checkpoint["search_stats"]
+        self.warm_start_is_best = checkpoint["warm_start_is_best"]
+        self.min_fatigue = checkpoint["min_fatigue"]
+        if checkpoint["best_placements"] is not None:
+            self.best_placements = [tuple(placement) for placement in checkpoint["best_placements"]]
+            self.best_day_fatigue = checkpoint["best_day_fatigue"]
+        if self.top_k is not None:
+            for fatigue, found, placements, day_fatigue in checkpoint["top"]:
+                placements = [tuple(placement) for placement in placements]
+                key = self.top_schedule_key(placements)
+                self.top_keys.add(key)
+                self.top_heap.append((-fatigue, -found, key, placements, day_fatigue))
+            heapq.heapify(self.top_heap)
+            self.top_found = checkpoint["top_found"]
+            self.top_best_fatigue = checkpoint["top_best_fatigue"]
+
+        # Replay the frames: each one's candidates follow from the placements of the frames below it
+        for index, task_id, opened, position, placement in checkpoint["frames"]:
+            frame = [index, task_id, self.candidate_assignments(task_id) if opened else None, position, None]
+            if placement is not None:
+                frame[4] = self.push_placement(task_id, *placement)
+            self.search_stack.append(frame)
+
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        return self.continue_search(time_limit, node_limit)
+
+    def prepare_transposition_table(self, size):
+        """
+        Zobrist keys of the search state and an empty transposition table of `size` slots (rounded up to a
+        power of two, 0 for no table, None for the default of `minimize_total_fatigue`), see
+        `transposition_cut_off`.
+        """
+        if size is None:
+            size = 0 if self.break_symmetry else TRANSPOSITION_TABLE_SIZE
+        self.transposition_size = size
+        self.transposition_table = None
+        if not size:
+            return
+        table = self.task_table
+        if not table.uniform_names:
+            # Which of two same-name tasks counts on a day depends on their task ids, which the hash does not see
+            self.transposition_size = 0
+            return
+        num_intervals = self.num_intervals_per_day
+        rng = random.Random(len(table))  # fixed keys, the same in every parallel worker
+        self.zobrist_task = [rng.getrandbits(64) for _ in range(len(table))]
+        self.zobrist_name = [rng.getrandbits(64) for _ in table.names]
+        self.zobrist_run = [rng.getrandbits(64) for _ in range(num_intervals + 1)]
+        self.zobrist_day = [rng.getrandbits(64) for _ in range(7)]
+        self.zobrist_slot_prefix = []  # prefix XORs, so a run of slots costs two lookups
+        for _ in range(7):
+            prefix = [0]
+            for _ in range(num_intervals):
+                prefix.append(prefix[-1] ^ rng.getrandbits(64))
+            self.zobrist_slot_prefix.append(prefix)
+        self.zobrist_start = [[rng.getrandbits(64) for _ in range(7 * num_intervals + 1)]
+                              if table.dependents[task_id] else None for task_id in range(len(table))]
+        # With break_symmetry days only differ by their task names and free run lengths once the fixed_time
+        # tasks (searched first) are placed, so states are compared up to the order of the days from there on
+        self.transposition_from = sum(fixed is not None for fixed in table.fixed) if self.break_symmetry else 0
+        self.reset_transposition_table()
+
+    def reset_transposition_table(self):
+        """
+        Empty the transposition table and hash the current placements.
+        """
+        if not self.transposition_size:
+            self.transposition_table = None
+            return
+        self.transposition_table = [None] * (1 << max(self.transposition_size - 1, 0).bit_length())
+        self.day_signature = lru_cache(maxsize=DAY_SIGNATURE_CACHE_SIZE)(self.compute_day_signature)
+        self.hash_state()
 
+    def hash_state(self):
+        """
+        Hash the current placements from scratch (see `hash_placement` for the incremental update).
+        """
+        self.placed_hash = 0
+        self.layout_hash = 0
+        for task_id, day_index, start_slot, num_slots in self.placements:
+            self.placed_hash ^= self.zobrist_task[task_id]
+            if not self.break_symmetry:
+                self.layout_hash ^= self.slot_hash(task_id, day_index, start_slot, num_slots)
+        for day_index in range(7):
+            if self.break_symmetry:
+                self.layout_hash += self.day_signature(self.day_task_bits[day_index], self.day_masks[day_index])
+            else:
+                task_bits = self.day_task_bits[day_index]
+                while task_bits:
+                    low = task_bits & -task_bits
+                    self.layout_hash ^= self.zobrist_name[low.bit_length() - 1] ^ self.zobrist_day[day_index]
+                    task_bits ^= low
+        self.layout_hash &= (1 << 64) - 1
+
+    def compute_day_signature(self, task_bits, day_mask):
+        """
+        Hash of a day's task names and the lengths of its free runs, whichever day it is.
+        """
+        signature = 0
+        while task_bits:
+            low = task_bits & -task_bits
+            signature ^= self.zobrist_name[low.bit_length() - 1]
+            task_bits ^= low
+        runs = 0
+        free = ~day_mask & self.full_day_mask
+        while free:
+            start_slot = (free & -free).bit_length() - 1
+            shifted = free >> start_slot
+            length = ((shifted + 1) & ~shifted).bit_length() - 1
+            runs += self.zobrist_run[length]  # a sum, so equal runs do not cancel out
+            free &= ~(((1 << length) - 1) << start_slot)
+        return signature ^ (runs & ((1 << 64) - 1))
+
+    def slot_hash(self, task_id, day_index, start_slot, num_slots):
+        """
+        Zobrist key of the slots a task takes and, for tasks with dependents, of where it starts.
+        """
+        prefix = self.zobrist_slot_prefix[day_index]
+        key = prefix[start_slot + num_slots] ^ prefix[start_slot]
+        if self.zobrist_start[task_id] is not None:
+            key ^= self.zobrist_start[task_id][day_index * self.num_intervals_per_day + start_slot]
+        return key
+
+    def hash_placement(self, task_id, day_index, start_slot, num_slots, is_new_task_for_day):
+        """
+        Update the state hash after task_id was placed (undone by restoring placed_hash and layout_hash).
+        """
+        self.placed_hash ^= self.zobrist_task[task_id]
+        if self.break_symmetry:
+            task_bits = self.day_task_bits[day_index]
+            day_mask = self.day_masks[day_index]
+            before = self.day_signature(task_bits & ~self.task_table.name_bit[task_id] if is_new_task_for_day
+                                        else task_bits, day_mask & ~(((1 << num_slots) - 1) << start_slot))
+            after = self.day_signature(task_bits, day_mask)
+            self.layout_hash = (self.layout_hash - before + after) & ((1 << 64) - 1)
+        else:
+            self.layout_hash ^= self.slot_hash(task_id, day_index, start_slot, num_slots)
             if is_new_task_for_day:
-                # Revert per-day tracking
-                self.day_unique_tasks[day_index].remove(task["name"])
-                self.day_difficulty_sum[day_index] -= task["difficulty"]
-                self.day_fatigue_sum[day_index] -= task["fatigue"]
-                old_day_fatigue = self.day_fatigue[day_index]
-                self.day_fatigue[day_index] = self.day_fatigue_sum[day_index] * (1 + self.day_difficulty_sum[day_index])
-                self.total_fatigue += self.day_fatigue[day_index] - old_day_fatigue
+                name_id = self.task_table.name_bit[task_id].bit_length() - 1
+                self.layout_hash ^= self.zobrist_name[name_id] ^ self.zobrist_day[day_index]
+
+    def transposition_cut_off(self, index):
+        """
+        Look the current state up in the transposition table. The same tasks on the same grid, with the same
+        task names on each day, leave the same subproblem whatever order they were placed in (with
+        break_symmetry: on days with the same names and free run lengths, in any order of the days). A stored
+        lower bound on the fatigue still to come then cuts the node if it cannot beat the incumbent.
+
+        :return: True if the node needs no search.
+        """
+        if index < self.transposition_from:
+            return False
+        state_hash = self.placed_hash ^ self.layout_hash
+        entry = self.transposition_table[state_hash & (len(self.transposition_table) - 1)]
+        self.search_stats["transposition_probes"] += 1
+        if entry is None or entry[0] != state_hash:
+            return False
+        self.search_stats["transposition_hits"] += 1
+        # The stored value comes from an incumbent: a state that only ties it cannot do better either
+        estimate = self.total_fatigue + entry[2]
+        if estimate + BOUND_TOLERANCE >= self.min_fatigue or estimate - BOUND_TOLERANCE > self.shared_bound:
+            self.search_stats["pruned_by_transposition"] += 1
+            return True
+        return False
+
+    def store_transposition(self, index):
+        """
+        Store what the finished search below the current state proved: no completion beats the incumbent (or a
+        parallel worker's shared bound), a lower bound on the fatigue still to come that is exact when this
+        subtree improved the incumbent. A slot holding another state is only taken over by a state with at
+        least as many tasks left, whose subtree is the more expensive one to search again.
+        """
+        if index < self.transposition_from:
+            return
+        state_hash = self.placed_hash ^ self.layout_hash
+        slot = state_hash & (len(self.transposition_table) - 1)
+        old_entry = self.transposition_table[slot]
+        tasks_left = len(self.tasks) - index
+        if old_entry is None or old_entry[0] == state_hash or old_entry[1] <= tasks_left:
+            remaining = min(self.min_fatigue, self.shared_bound) - self.total_fatigue
+            self.transposition_table[slot] = (state_hash, tasks_left, remaining)
+
+    def transposition_stats(self):
+        """
+        Number of filled transposition table slots and an estimate of the table's memory use in bytes.
+        """
+        if self.transposition_table is None:
+            return {}
+        entries = [entry for entry in self.transposition_table if entry is not None]
+        memory = sys.getsizeof(self.transposition_table)
+        if entries:
+            memory += len(entries) * (sys.getsizeof(entries[0]) + sum(sys.getsizeof(value) for value in entries[0]))
+        return {"transposition_entries": len(entries), "transposition_bytes": memory}
+
+    def is_cut_off(self, index):
+        """
+        Prune if current total fatigue (plus what tasks[index:] must still add) can no longer beat the
+        minimum found. In a parallel worker, schedules that tie the shared best are still explored so
+        ties resolve as in the serial search.
+        """
+        if self.total_fatigue >= self.min_fatigue or self.total_fatigue > self.shared_bound:
+            return True
+        if not self.use_bound or (self.min_fatigue == float('inf') and self.shared_bound == float('inf')):
+            return False
+        estimate = self.total_fatigue + self.remaining_fatigue_lower_bound(index) - BOUND_TOLERANCE
+        return estimate >= self.min_fatigue or estimate > self.shared_bound
+
+    def dependency_cut_off(self, task_id):
+        """
+        Earliest-start propagation after placing task_id. Task ids put prerequisites first (see prepare_search),
+        so one pass over the unplaced tasks gives each of them the earliest start its prerequisites allow: the
+        real end of placed ones, the earliest end of the others. A floating task
+        that would cross midnight moves to the next day. Prune if some task would start after its fixed_time
+        or end after the week.
+        """
+        table = self.task_table
+        if not table.dependents[task_id]:
+            return False
+        num_intervals = self.num_intervals_per_day
+        earliest = {}
+        for other in range(len(table)):
+            if other in self.task_start:
+                continue
+            start = 0
+            for prerequisite in table.prerequisites[other]:
+                if prerequisite in self.task_start:
+                    end = self.task_start[prerequisite] + table.slots_of[prerequisite]
+                else:
+                    end = earliest[prerequisite] + table.slots_of[prerequisite]
+                start = max(start, end)
+            num_slots = table.slots_of[other]
+            fixed_position = table.fixed[other]
+            if fixed_position is not None:
+                fixed_start = fixed_position[0] * num_intervals + fixed_position[1]
+                if start > fixed_start:
+                    return True
+                start = fixed_start
+            else:
+                if start % num_intervals + num_slots > num_intervals:
+                    start = (start // num_intervals + 1) * num_intervals
+                if start + num_slots > 7 * num_intervals:
+                    return True
+            earliest[other] = start
+        return False
+
+    def candidate_assignments(self, task_id):
+        num_slots = self.task_table.slots_of[task_id]
+        fixed_position = self.task_table.fixed[task_id]
+        if self.break_symmetry and fixed_position is None:
+            return self.canonical_assignments(num_slots)
+        if self.task_table.has_dependencies:
+            return self.assignments(num_slots, fixed_position, self.dependency_window(task_id))
+        return self.assignments(num_slots, fixed_position)
+
+    def most_constrained_task(self):
+        """
+        Forward checking with dynamic variable ordering: count the candidate placements left to every
+        unplaced task under the current placements and return the task with the fewest (lowest task id on
+        ties), or None if some task has none left. Only tasks that may be placed next are returned: those
+        whose prerequisites are placed, the lowest unplaced id of a name whose tasks differ in fatigue or
+        difficulty (so the day sums only grow, see `remaining_fatigue_lower_bound`), and fixed_time tasks
+        before floating ones when breaking symmetry
+        (see `get_canonical_assignments`). Floating tasks without dependencies share one count per length,
+        taken from the free runs of the days (see `count_floating_assignments`).
+        """
+        table = self.task_table
+        counts_by_slots = {}
+        day_runs = None
+        fixed_left = False
+        best = None  # (count, task_id) of the best task that may go next
+        best_fixed = None
+        unplaced_names = 0
+        for task_id in range(len(table)):
+            if task_id in self.task_day:
+                continue
+            name_bit = table.name_bit[task_id]
+            name_waits = unplaced_names & name_bit
+            unplaced_names |= name_bit
+            num_slots = table.slots_of[task_id]
+            is_fixed = table.fixed[task_id] is not None
+            if is_fixed or num_slots <= 0 or table.prerequisites[task_id] or table.dependents[task_id]:
+                count = len(self.candidate_assignments(task_id))
+            else:
+                if num_slots not in counts_by_slots:
+                    if day_runs is None:
+                        day_runs = [self.free_intervals(day_index) for day_index in range(7)]
+                    counts_by_slots[num_slots] = self.count_floating_assignments(num_slots, day_runs)
+                count = counts_by_slots[num_slots]
+            if not count:
+                return None
+            if any(prerequisite not in self.task_day for prerequisite in table.prerequisites[task_id]):
+                continue
+            if name_waits and not table.uniform_names:
+                continue
+            if best is None or count < best[0]:
+                best = (count, task_id)
+            if is_fixed:
+                fixed_left = True
+                if best_fixed is None or count < best_fixed[0]:
+                    best_fixed = (count, task_id)
+        if self.break_symmetry and fixed_left:
+            return best_fixed[1]
+        return best[1]
+
+    def count_floating_assignments(self, num_slots, day_runs):
+        """
+        Number of `candidate_assignments` of a floating task without dependencies (num_slots > 0), given the
+        free runs of every day as returned by `free_intervals`.
+        """
+        count = 0
+        empty_day_seen = False
+        for day_index in self.search_days:
+            runs = day_runs[day_index]
+            if not self.break_symmetry:
+                count += sum(length - num_slots + 1 for _, length in runs if length >= num_slots)
+                continue
+            if not self.day_masks[day_index] and not self.day_task_bits[day_index]:
+                if empty_day_seen:
+                    continue
+                empty_day_seen = True
+            count += len({length for _, length in runs if length >= num_slots})
+        return count
 
     def count_possible_assignments(self, task):
         """
@@ -193,25 +2165,375 @@ class Scheduler:
         """
         Get all possible assignments for a task.
         """
+        fixed_position = self.fixed_start_slot(task) if task.get("fixed_time") else None
+        return self.assignments(self.slot_count(task), fixed_position)
+
+    def assignments(self, num_slots, fixed_position=None, window=None):
+        """
+        All (day_index, start_slot, num_slots) placements of a run of num_slots slots, or only the
+        fixed (day_index, start_slot) position if one is given.
+
+        :param window: (earliest start, latest end) in week slots the run has to stay in, see dependency_window.
+        """
         assignments = []
-        duration = task["time"]  # Duration in hours
-        num_slots = int(duration * (60 / self.interval_minutes))  # Convert to number of slots
-
-        if task.get("fixed_time"):
-            day, start_hour, start_minute = task["fixed_time"]
-            day_index = self.days.index(day)
-            start_slot = int(
-                (start_hour - self.start_time) * (60 / self.interval_minutes) + start_minute / self.interval_minutes)
+        earliest, latest = window or (0, 7 * self.num_intervals_per_day)
+        if fixed_position is not None:
+            day_index, start_slot = fixed_position
             if 0 <= start_slot <= self.num_intervals_per_day - num_slots:
-                if all(self.schedule[day_index][slot] is None for slot in range(start_slot, start_slot + num_slots)):
+                week_start = day_index * self.num_intervals_per_day + start_slot
+                if self.is_free(day_index, start_slot, num_slots) and earliest <= week_start <= latest - num_slots:
                     assignments.append((day_index, start_slot, num_slots))
         else:
-            for day_index in range(7):
-                for start_slot in range(self.num_intervals_per_day - num_slots + 1):
-                    if all(self.schedule[day_index][slot] is None for slot in range(start_slot, start_slot + num_slots)):
-                        assignments.append((day_index, start_slot, num_slots))
+            for day_index in self.search_days:
+                starts = self.free_start_mask(day_index, num_slots)
+                if window is not None:
+                    first = earliest - day_index * self.num_intervals_per_day
+                    last = latest - num_slots - day_index * self.num_intervals_per_day
+                    if last < max(first, 0):
+                        continue
+                    starts &= ((1 << (last + 1)) - 1) & ~((1 << max(first, 0)) - 1)
+                while starts:
+                    low = starts & -starts
+                    assignments.append((day_index, low.bit_length() - 1, num_slots))
+                    starts ^= low
         return assignments
 
+    def free_intervals(self, day_index):
+        """
+        Maximal runs of free slots on a day as (start_slot, length), in slot order.
+        """
+        intervals = []
+        free = ~self.day_masks[day_index] & self.full_day_mask
+        while free:
+            start_slot = (free & -free).bit_length() - 1
+            shifted = free >> start_slot
+            length = ((shifted + 1) & ~shifted).bit_length() - 1  # position of the first taken slot
+            intervals.append((start_slot, length))
+            free &= ~(((1 << length) - 1) << start_slot)
+        return intervals
+
+    def get_canonical_assignments(self, task):
+        """
+        Get one representative of every group of equivalent assignments for a floating task.
+
+        Fatigue only depends on which tasks share a day, and once all fixed_time tasks are placed a
+        day's remaining capacity only matters through the lengths of its free runs. Any start inside a
+        run splits it in two pieces that fit no more than the single leftover piece of a start at the
+        beginning of the run, and runs of equal length give the same result, so one start per distinct
+        run length is enough. Days that are still completely empty are interchangeable as well.
+        """
+        return self.canonical_assignments(self.slot_count(task))
+
+    def canonical_assignments(self, num_slots):
+        """
+        `get_canonical_assignments` for a run of num_slots slots.
+        """
+        assignments = []
+        empty_day_seen = False
+
+        for day_index in self.search_days:
+            if not self.day_masks[day_index] and not self.day_task_bits[day_index]:
+                if empty_day_seen:
+                    continue
+                empty_day_seen = True
+            seen_lengths = set()
+            for start_slot, length in self.free_intervals(day_index):
+                if length < num_slots or length in seen_lengths:
+                    continue
+                seen_lengths.add(length)
+                assignments.append((day_index, start_slot, num_slots))
+        return assignments
+
+    def solve_milp(self, backend=None):
+        """
+        Exact schedule from an integer program, solved by a locally installed ortools (CP-SAT) or pulp (CBC).
+
+        x[task, day, start] = 1 when the task starts there: every task takes exactly one of its placements
+        (fixed_time tasks only have one) and every slot holds at most one task. y[name, day] = 1 when the
+        day has a task with that name, and w[name, other, day] = y[name, day] AND y[other, day], so a day's
+        fatigue (F)(1 + D) expands into the linear objective
+        sum f(1 + d) * y + sum (f * d' + f' * d) * w. A task starts no earlier than each prerequisite ends:
+        sum start * x[task] >= sum end * x[prerequisite]. The warm start, if any, is passed as a hint.
+        Respects time_limit (node_limit does not apply). Reports the backend and its status in search_stats.
+
+        :param backend: "ortools" or "pulp", default the first one installed.
+        :return: False if the backend is not installed or tasks sharing a name differ in fatigue or difficulty
+                 (the model has one variable per name and day), True otherwise.
+        """
+        table = self.task_table
+        if not table.uniform_names:
+            return False
+        model = create_model(backend)
+        if model is None:
+            return False
+        self.clear_schedule()
+        self.reset_day_tracking()
+        self.search_stats["milp_backend"] = model.name
+
+        options = []  # (variable, task_id, day_index, start_slot, num_slots)
+        task_day_vars = [[[] for _ in range(7)] for _ in range(len(table))]
+        task_starts = [[] for _ in range(len(table))]  # (variable, start in week slots)
+        slot_vars = [[[] for _ in range(self.num_intervals_per_day)] for _ in range(7)]
+        for task_id in range(len(table)):
+            num_slots = table.slots_of[task_id]
+            variables = []
+            for day_index, start_slot, _ in self.assignments(num_slots, table.fixed[task_id]):
+                variable = model.bool_var(f"x_{task_id}_{day_index}_{start_slot}")
+                variables.append(variable)
+                options.append((variable, task_id, day_index, start_slot, num_slots))
+                task_day_vars[task_id][day_index].append(variable)
+                task_starts[task_id].append((variable, day_index * self.num_intervals_per_day + start_slot))
+                for slot in range(start_slot, start_slot + num_slots):
+                    slot_vars[day_index][slot].append(variable)
+            if not variables:
+                self.search_stats["milp_status"] = "infeasible"
+                return True
+            model.add_exactly_one(variables)
+        for day_slots in slot_vars:
+            for variables in day_slots:
+                if len(variables) > 1:
+                    model.add_at_most_one(variables)
+        for task_id in range(len(table)):
+            for prerequisite in table.prerequisites[task_id]:
+                end_terms = [(-(start + table.slots_of[prerequisite]), variable)
+                             for variable, start in task_starts[prerequisite]]
+                model.add_at_least([(start, variable) for variable, start in task_starts[task_id]] + end_terms, 0)
+
+        objective = []
+        name_tasks = [[] for _ in table.names]
+        for task_id in range(len(table)):
+            name_tasks[table.name_id[task_id]].append(task_id)
+        for day_index in range(7):
+            day_names = []  # (y, fatigue, difficulty)
+            for name_id, task_ids in enumerate(name_tasks):
+                on_day = [variable for task_id in task_ids for variable in task_day_vars[task_id][day_index]]
+                if not on_day:
+                    continue
+                name_on_day = model.bool_var(f"y_{name_id}_{day_index}")
+                for task_id in task_ids:
+                    if task_day_vars[task_id][day_index]:
+                        model.add_at_least([(1, name_on_day)] + [(-1, v) for v in task_day_vars[task_id][day_index]], 0)
+                model.add_at_least([(1, variable) for variable in on_day] + [(-1, name_on_day)], 0)
+                representative = table.name_task[name_id]
+                fatigue, difficulty = table.fatigue_of[representative], table.difficulty_of[representative]
+                objective.append((fatigue * (1 + difficulty), name_on_day))
+                day_names.append((name_on_day, fatigue, difficulty, name_id))
+            for i, (first, first_fatigue, first_difficulty, first_name) in enumerate(day_names):
+                for second, second_fatigue, second_difficulty, second_name in day_names[i + 1:]:
+                    coefficient = first_fatigue * second_difficulty + second_fatigue * first_difficulty
+                    if coefficient == 0:
+                        continue
+                    both = model.bool_var(f"w_{first_name}_{second_name}_{day_index}")
+                    model.add_at_least([(1, both), (-1, first), (-1, second)], -1)
+                    if coefficient < 0:
+                        model.add_at_least([(1, first), (-1, both)], 0)
+                        model.add_at_least([(1, second), (-1, both)], 0)
+                    objective.append((coefficient, both))
+        model.minimize(objective)
+
+        if self.best_placements is not None:
+            chosen = {(task_id, day_index, start_slot) for task_id, day_index, start_slot, _ in self.best_placements}
+            for variable, task_id, day_index, start_slot, _ in options:
+                model.hint(variable, (task_id, day_index, start_slot) in chosen)
+
+        time_limit = None if self.deadline is None else max(0.0, self.deadline - time.perf_counter())
+        status = model.solve(time_limit)
+        self.search_stats["milp_status"] = status
+        # A rounded objective (CP-SAT) or a time-out leaves optimality unproven
+        self.search_stopped = not (status in ("optimal", "infeasible") and model.exact)
+        if status not in ("optimal", "feasible"):
+            return True
+
+        for variable, task_id, day_index, start_slot, num_slots in options:
+            if model.value(variable):
+                self.occupy(task_id, day_index, start_slot, num_slots)
+                self.add_to_day(task_id, day_index)
+        if self.total_fatigue < self.min_fatigue:
+            self.warm_start_is_best = False
+            self.record_best(list(self.placements), self.total_fatigue, list(self.day_fatigue))
+        self.clear_schedule()
+        self.reset_day_tracking()
+        return True
+
+    def day_partition_applicable(self):
+        """
+        Whether `solve_day_partition` is exact for the current search setup: fatigue is the default or a
+        `generate_fatigue_function` expression of the task's own attributes, no placement order is
+        requested (break_symmetry), task names are distinct, there are no dependencies (the DP only decides
+        days, not times) and the floating tasks fit the subset tables.
+        """
+        fatigue_calculation = getattr(self.fatigue_calculation, "__func__", self.fatigue_calculation)
+        if fatigue_calculation is not Scheduler.default_fatigue_calculation \
+                and not hasattr(self.fatigue_calculation, "expression"):
+            return False
+        table = self.task_table
+        num_floating = sum(1 for fixed_position in table.fixed if fixed_position is None)
+        return (self.break_symmetry and len(table.names) == len(table) and not table.has_dependencies
+                and num_floating <= DAY_PARTITION_MAX_TASKS)
+
+    def solve_day_partition(self):
+        """
+        Exact solver for the default fatigue model, which only depends on how tasks are split into days.
+
+        The fixed_time tasks are placed first. A memoized DP over the days then gives every day a subset of
+        the remaining floating tasks: best(k, rest) = min over subsets s of rest that fit day k of
+        day_cost(k, s) + best(k + 1, rest - s). Fully free days are interchangeable, so they come last and
+        each takes the lowest remaining task. A subset fits a free day if its slots add up to at most the
+        day's length, and a day with fixed tasks if it can be packed into the day's free runs.
+        Counts DP states as search nodes, so the time and node budgets apply.
+        """
+        table = self.task_table
+        self.clear_schedule()
+        self.reset_day_tracking()
+        for task_id, fixed_position in enumerate(table.fixed):
+            if fixed_position is None:
+                continue
+            day_index, start_slot = fixed_position
+            num_slots = table.slots_of[task_id]
+            if start_slot < 0 or start_slot + num_slots > self.num_intervals_per_day \
+                    or not self.is_free(day_index, start_slot, num_slots):
+                self.clear_schedule()
+                self.reset_day_tracking()
+                return
+            self.occupy(task_id, day_index, start_slot, num_slots)
+            self.add_to_day(task_id, day_index)
+
+        floating = [task_id for task_id, fixed_position in enumerate(table.fixed) if fixed_position is None]
+        # Fatigue, difficulty and slot sums of every subset of the floating tasks (bit i = floating[i])
+        subset_fatigue = np.zeros(1 << len(floating))
+        subset_difficulty = np.zeros(1 << len(floating))
+        subset_slots = np.zeros(1 << len(floating), dtype=np.int64)
+        for bit, task_id in enumerate(floating):
+            low, high = 1 << bit, 2 << bit
+            subset_fatigue[low:high] = subset_fatigue[:low] + table.fatigue[task_id]
+            subset_difficulty[low:high] = subset_difficulty[:low] + table.difficulty[task_id]
+            subset_slots[low:high] = subset_slots[:low] + table.slots[task_id]
+        subset_fatigue = subset_fatigue.tolist()
+        subset_difficulty = subset_difficulty.tolist()
+        subset_slots = subset_slots.tolist()
+
+        free_days = [day_index for day_index in range(7) if not self.day_masks[day_index]]
+        day_order = [day_index for day_index in range(7) if self.day_masks[day_index]] + free_days
+        first_free = 7 - len(free_days)
+        day_runs = [self.free_intervals(day_index) for day_index in day_order]
+        capacity = [sum(length for _, length in runs) for runs in day_runs]
+        capacity_left = [sum(capacity[k:]) for k in range(8)]
+        base_fatigue = [self.day_fatigue_sum[day_index] for day_index in day_order]
+        base_difficulty = [self.day_difficulty_sum[day_index] for day_index in day_order]
+        # With non-negative attributes no day costs less than 0, so a day alone can rule out a subset
+        non_negative = bool((table.fatigue >= 0).all() and (table.difficulty >= 0).all())
+        packings = [{} for _ in range(7)]
+        memo = [{} for _ in range(8)]
+        choice = [{} for _ in range(7)]
+
+        def fits(k, subset):
+            if subset_slots[subset] > capacity[k]:
+                return False
+            if k >= first_free:
+                return True
+            if subset not in packings[k]:
+                task_ids = [floating[bit] for bit in range(len(floating)) if subset >> bit & 1]
+                packings[k][subset] = self.pack_into_runs(day_runs[k], task_ids)
+            return packings[k][subset] is not None
+
+        def best(k, rest):
+            if k == 7:
+                return 0.0 if not rest else float('inf')
+            if rest in memo[k]:
+                return memo[k][rest]
+            self.search_stats["nodes"] += 1
+            if self.search_stats["nodes"] >= self.next_budget_check:
+                self.check_budget()
+            if self.search_stopped:
+                return float('inf')
+
+            best_cost, best_subset = float('inf'), None
+            if k >= first_free and not rest:
+                best_cost, best_subset = 0.0, 0
+            elif subset_slots[rest] <= capacity_left[k]:
+                if k == 6:
+                    subsets = [rest]
+                elif k >= first_free:
+                    # Free days are interchangeable: the lowest remaining task opens the next one
+                    low = rest & -rest
+                    subsets = [subset | low for subset in submasks(rest ^ low)]
+                else:
+                    subsets = submasks(rest)
+                for subset in subsets:
+                    if not fits(k, subset):
+                        continue
+                    fatigue_sum = base_fatigue[k] + subset_fatigue[subset]
+                    cost = fatigue_sum * (1 + base_difficulty[k] + subset_difficulty[subset])
+                    if non_negative and cost >= best_cost:
+                        continue
+                    cost += best(k + 1, rest ^ subset)
+                    if cost < best_cost:
+                        best_cost, best_subset = cost, subset
+            if not self.search_stopped:
+                memo[k][rest] = best_cost
+                choice[k][rest] = best_subset
+            return best_cost
+
+        total = best(0, (1 << len(floating)) - 1)
+        if self.search_stopped or total == float('inf'):
+            self.clear_schedule()
+            self.reset_day_tracking()
+            return
+
+        rest = (1 << len(floating)) - 1
+        for k, day_index in enumerate(day_order):
+            subset = choice[k].get(rest, 0) if rest else 0
+            task_ids = [floating[bit] for bit in range(len(floating)) if subset >> bit & 1]
+            if k >= first_free:
+                placed, start_slot = [], 0
+                for task_id in task_ids:
+                    placed.append((task_id, start_slot))
+                    start_slot += table.slots_of[task_id]
+            else:
+                placed = self.pack_into_runs(day_runs[k], task_ids)
+            for task_id, start_slot in placed:
+                self.occupy(task_id, day_index, start_slot, table.slots_of[task_id])
+                self.add_to_day(task_id, day_index)
+            rest ^= subset
+
+        if self.total_fatigue < self.min_fatigue:
+            self.warm_start_is_best = False
+            self.record_best(list(self.placements), self.total_fatigue, list(self.day_fatigue))
+        self.clear_schedule()
+        self.reset_day_tracking()
+
+    def pack_into_runs(self, runs, task_ids):
+        """
+        Pack tasks into free runs of (start_slot, length), each run filled from its start.
+
+        :return: List of (task_id, start_slot), or None if the tasks do not fit.
+        """
+        table = self.task_table
+        task_ids = sorted(task_ids, key=lambda task_id: -table.slots_of[task_id])
+        used = [0] * len(runs)
+        placed = []
+
+        def place(index):
+            if index == len(task_ids):
+                return True
+            task_id = task_ids[index]
+            num_slots = table.slots_of[task_id]
+            tried = set()
+            for run, (start_slot, length) in enumerate(runs):
+                left = length - used[run]
+                if left < num_slots or left in tried:
+                    continue
+                tried.add(left)  # runs with the same space left are interchangeable
+                placed.append((task_id, start_slot + used[run]))
+                used[run] += num_slots
+                if place(index + 1):
+                    return True
+                used[run] -= num_slots
+                placed.pop()
+            return False
+
+        return placed if place(0) else None
+
     def generate_schedule_list(self, schedule=None):
         """
         Convert the schedule to a list format for GUI or printing.
@@ -263,23 +2585,150 @@ class Scheduler:
                 'task_num': 1
             }
 
-        # Extract variables used in the expression
-        tokens = re.findall(r'\b[A-Za-z_]\w*\b', expression)
-        for token in tokens:
-            if token not in allowed_vars:
-                raise ValueError(f"數學式子中包含無效或未允許的變數: {token}")
+        # Validate the syntax tree: only arithmetic on numbers and allowed variables
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"數學式子語法錯誤: {expression}") from e
+        variables = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                if node.id not in allowed_vars:
+                    raise ValueError(f"數學式子中包含無效或未允許的變數: {node.id}")
+                if node.id not in variables:
+                    variables.append(node.id)
+            elif isinstance(node, ast.Constant):
+                if type(node.value) not in (int, float):
+                    raise ValueError(f"數學式子中包含不允許的常數: {node.value!r}")
+            elif not isinstance(node, EXPRESSION_NODES):
+                raise ValueError(f"數學式子中包含不允許的語法: {type(node).__name__}")
+
+        # Compile once into a plain function of the variables the expression uses
+        lambda_tree = ast.Expression(body=ast.Lambda(
+            args=ast.arguments(posonlyargs=[], args=[ast.arg(arg=var) for var in variables], kwonlyargs=[],
+                               kw_defaults=[], defaults=[]),
+            body=tree.body))
+        ast.fix_missing_locations(lambda_tree)
+        compiled = eval(compile(lambda_tree, "<fatigue expression>", "eval"), {"__builtins__": {}})
+        defaults = [default_values.get(var, 1) for var in variables]
 
         # Return a function that calculates fatigue based on the expression
         def fatigue_function(task):
-            # Build the evaluation context
-            eval_dict = {}
-            for var in allowed_vars:
-                eval_dict[var] = task.get(var, default_values.get(var, 1))
-            return eval(expression, {}, eval_dict)
-
+            return compiled(*[task.get(var, default) for var, default in zip(variables, defaults)])
+
+        def vectorized(attributes):
+            """
+            Evaluate the expression for many tasks at once.
+
+            :param attributes: Dict mapping variable name to a NumPy array (one entry per task);
+                               missing variables use their default value.
+            :return: NumPy float array of fatigue values.
+            """
+            columns = [np.asarray(attributes[var], dtype=float) if var in attributes else default
+                       for var, default in zip(variables, defaults)]
+            # One entry per task even if the expression uses none of the given columns (e.g. a constant)
+            size = max((len(np.atleast_1d(column)) for column in attributes.values()), default=1)
+            return np.broadcast_to(np.asarray(compiled(*columns), dtype=float), (size,)).copy()
+
+        fatigue_function.expression = expression
+        fatigue_function.variables = tuple(variables)
+        fatigue_function.vectorized = vectorized
         return fatigue_function
 
 
+def batch_day_fatigue(schedules, task_fatigue, task_multiplier, count_repeats=False):
+    """
+    Vectorized day fatigue of many schedules: sum(fatigue) * (1 + sum(multiplier)) per day.
+
+    :param schedules: int array (candidates x days x slots) of task indices, -1 for free slots.
+    :param task_fatigue: Fatigue of each task index.
+    :param task_multiplier: Value each task adds to the day multiplier (difficulty, priority, ...).
+    :param count_repeats: Count a task once per occupied slot instead of once per day.
+    :return: (total fatigue per candidate, fatigue per candidate and day)
+    """
+    schedules = np.asarray(schedules, dtype=np.int64)
+    task_fatigue = np.asarray(task_fatigue, dtype=float)
+    task_multiplier = np.asarray(task_multiplier, dtype=float)
+    num_candidates, num_days, _ = schedules.shape
+    num_tasks = len(task_fatigue)
+
+    # Histogram of task indices per (candidate, day); column 0 collects the free slots
+    rows = num_candidates * num_days
+    flat = (np.arange(rows)[:, None] * (num_tasks + 1) + schedules.reshape(rows, -1) + 1).ravel()
+    counts = np.bincount(flat, minlength=rows * (num_tasks + 1)).reshape(rows, num_tasks + 1)[:, 1:]
+    if not count_repeats:
+        counts = counts > 0
+    counts = counts.astype(float)
+
+    day_fatigue = (counts @ task_fatigue) * (1 + counts @ task_multiplier)
+    day_fatigue = day_fatigue.reshape(num_candidates, num_days)
+    return day_fatigue.sum(axis=1), day_fatigue
+
+
+def topological_order(task_ids, prerequisites, names=None):
+    """
+    Kahn's algorithm: the task ids reordered so that every task comes after its prerequisites, otherwise in
+    the given order as far as possible (ready tasks are taken first come, first served). O(tasks + edges).
+
+    :param task_ids: Task ids to order.
+    :param prerequisites: prerequisites[task_id] = task ids that have to come before it.
+    :param names: Task names by task id, for the error message.
+    """
+    task_ids = list(task_ids)
+    waiting = {task_id: 0 for task_id in task_ids}
+    dependents = {task_id: [] for task_id in task_ids}
+    for task_id in task_ids:
+        for other in prerequisites[task_id]:
+            waiting[task_id] += 1
+            dependents[other].append(task_id)
+
+    ready = deque(task_id for task_id in task_ids if not waiting[task_id])
+    order = []
+    while ready:
+        task_id = ready.popleft()
+        order.append(task_id)
+        for other in dependents[task_id]:
+            waiting[other] -= 1
+            if not waiting[other]:
+                ready.append(other)
+
+    if len(order) < len(task_ids):
+        cycle = [task_id for task_id in task_ids if waiting[task_id]]
+        if names is not None:
+            cycle = [names[task_id] for task_id in cycle]
+        raise ValueError(f"任務的前置關係有循環: {', '.join(map(str, cycle))}")
+    return order
+
+
+def submasks(mask):
+    """
+    All subsets of a bitmask, from mask itself down to 0.
+    """
+    subsets = []
+    subset = mask
+    while True:
+        subsets.append(subset)
+        if not subset:
+            return subsets
+        subset = (subset - 1) & mask
+
+
+# Worker process state of Scheduler.minimize_total_fatigue_parallel
+subproblem_worker = None
+
+
+def init_subproblem_worker(scheduler, shared_best, deadline, node_limit):
+    global subproblem_worker
+    scheduler.shared_best = shared_best
+    scheduler.subproblem_budget = (deadline, node_limit)
+    scheduler.reset_day_fatigue_cache()
+    subproblem_worker = scheduler
+
+
+def solve_subproblem(index, prefix):
+    return subproblem_worker.solve_subproblem(index, prefix)
+
+
 # 定義轉換函數
 def convert_tasklist(tasklist):
     tasks = []
@@ -331,16 +2780,16 @@ tasklist = [
     # [5, 'task3', 1733323535, {'_name': 'task5', '_difficulty': 5, '_spent time': 2, '_comments': 'this is too hard','_priority_level': 'low', '_waiting': None}],
     [6, 'task3', 1733323535, {'_name': 'task6', '_difficulty': 5, '_spent time': 2, '_comments': 'this is too hard','_priority_level': 'high', '_waiting': None}],]
 
-# 轉換 tasklist
-tasks = convert_tasklist(tasklist)
-
-# 輸出轉換後的 tasks
-print("轉換後的 tasks 列表:")
-for task in tasks:
-    print(task)
-
 # 初始化 Scheduler 並添加任務
 if __name__ == "__main__":
+    # 轉換 tasklist
+    tasks = convert_tasklist(tasklist)
+
+    # 輸出轉換後的 tasks
+    print("轉換後的 tasks 列表:")
+    for task in tasks:
+        print(task)
+
     user_allowed_vars = ['difficulty', 'time', 'priority', 'task_num', 'priority_level', 'deadline']
     user_expression = "difficulty * time"
 
@@ -0,0 +1,44 @@
+# conftest.py
+# Shared fixtures of the scheduler tests; scheduler.py lives in the repository root.
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import Scheduler  # noqa: E402
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+@pytest.fixture
+def make_scheduler():
+    """
+    make_scheduler(tasks, start_time=9, end_time=12): a Scheduler holding copies of the task dicts.
+    The short default day keeps the exact searches small.
+    """
+    def make(tasks, start_time=9, end_time=12):
+        scheduler = Scheduler(start_time=start_time, end_time=end_time)
+        scheduler.add_tasks([dict(task) for task in tasks])
+        return scheduler
+    return make
+
+
+@pytest.fixture
+def random_tasks():
+    """
+    random_tasks(seed, count, num_names=None, fixed=0): reproducible random tasks, with distinct names unless
+    num_names is given; the first `fixed` of them get a fixed_time on distinct days.
+    """
+    def generate(seed, count, num_names=None, fixed=0):
+        rng = random.Random(seed)
+        tasks = []
+        for i in range(count):
+            tasks.append({"name": f"task{i % num_names if num_names else i}", "difficulty": rng.randint(1, 5),
+                          "time": rng.choice([0.5, 1, 1.5, 2]), "priority": rng.choice([None, 1, 2])})
+        for i, day in enumerate(rng.sample(DAYS, fixed)):
+            tasks[i]["fixed_time"] = (day, 9, 30 * rng.randrange(2))
+        return tasks
+    return generate
@@ -0,0 +1,35 @@
+# test_checkpoint.py
+# Scheduler.resume_from_checkpoint: a search restarted from its checkpoint file ends as an uninterrupted one.
+import pytest
+
+
+@pytest.mark.parametrize("options", [{}, {"break_symmetry": False}, {"forward_checking": True}, {"top_k": 3}],
+                         ids=["default", "no_symmetry_breaking", "forward_checking", "top_k"])
+@pytest.mark.parametrize("seed", range(3))
+def test_resumed_search_matches_uninterrupted(make_scheduler, random_tasks, tmp_path, options, seed):
+    tasks = random_tasks(seed, 5, num_names=4 if seed == 2 else None, fixed=seed % 2)
+    uninterrupted = make_scheduler(tasks, end_time=11)
+    expected = uninterrupted.minimize_total_fatigue(**options)
+
+    path = tmp_path / "search.json"
+    budget = max(uninterrupted.search_stats["nodes"] // 4, 3)  # a few restarts
+    scheduler = make_scheduler(tasks, end_time=11)
+    result = scheduler.minimize_total_fatigue(node_limit=3, checkpoint_path=str(path), **options)
+    restarts = 0
+    while not scheduler.proven_optimal:
+        scheduler = make_scheduler(tasks, end_time=11)  # as in a new process
+        result = scheduler.resume_from_checkpoint(str(path), node_limit=budget)
+        restarts += 1
+    assert restarts > 0
+    assert repr(result) == repr(expected)
+
+    # A finished checkpoint returns the result again
+    assert repr(make_scheduler(tasks, end_time=11).resume_from_checkpoint(str(path))) == repr(expected)
+
+
+def test_checkpoint_of_other_tasks_is_rejected(make_scheduler, random_tasks, tmp_path):
+    tasks = random_tasks(0, 5)
+    path = tmp_path / "search.json"
+    make_scheduler(tasks, end_time=11).minimize_total_fatigue(node_limit=3, checkpoint_path=str(path))
+    with pytest.raises(ValueError):
+        make_scheduler(tasks[:-1], end_time=11).resume_from_checkpoint(str(path))
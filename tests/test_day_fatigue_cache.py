@@ -0,0 +1,46 @@
+# test_day_fatigue_cache.py
+# Scheduler.day_fatigue_cache: day fatigue memoized by the bitset of task ids on the day.
+import pytest
+
+
+def test_same_name_tasks_with_different_attributes_are_cached_apart(make_scheduler):
+    # Keyed on names, both days would hold {"meeting"} and share one cached value
+    meetings = [{"name": "meeting", "difficulty": 4, "time": 1.5, "fixed_time": ("Wednesday", 9, 0)},
+                {"name": "meeting", "difficulty": 3, "time": 0.5, "fixed_time": ("Monday", 9, 0)}]
+    scheduler = make_scheduler(meetings)
+    _, fatigue, day_fatigue = scheduler.minimize_total_fatigue()
+
+    assert fatigue == pytest.approx(6.0 * 5 + 1.5 * 4)
+    assert sorted(day_fatigue) == pytest.approx([0.0] * 5 + [6.0, 30.0])
+    scheduler.load_placements()
+    assert scheduler.calculate_fatigue() == pytest.approx(fatigue)
+
+
+def test_lowest_task_id_counts_for_a_repeated_name(make_scheduler):
+    scheduler = make_scheduler([{"name": "a", "difficulty": 2, "time": 1}, {"name": "a", "difficulty": 5, "time": 1},
+                                {"name": "b", "difficulty": 1, "time": 1}])
+    scheduler.index_tasks()
+    assert scheduler.day_fatigue_cache(0b011) == pytest.approx(2 * (1 + 2))
+    assert scheduler.day_fatigue_cache(0b110) == pytest.approx((5 + 1) * (1 + 5 + 1))
+    assert scheduler.day_fatigue_cache(0b111) == pytest.approx((2 + 1) * (1 + 2 + 1))
+    assert scheduler.day_fatigue_cache(0) == 0.0
+
+
+def test_search_reports_cache_hits_and_misses(make_scheduler, random_tasks):
+    scheduler = make_scheduler(random_tasks(3, 6))
+    scheduler.minimize_total_fatigue(break_symmetry=False, transposition_size=0, node_limit=2000)
+    stats = scheduler.search_stats
+    hits, misses = stats["day_fatigue_cache_hits"], stats["day_fatigue_cache_misses"]
+
+    assert misses <= 2 ** 6  # one per task subset at most, whichever day it is on
+    assert hits > 10 * misses
+    assert (hits, misses) == scheduler.day_fatigue_cache.cache_info()[:2]
+
+
+def test_cache_is_reset_when_the_tasks_change(make_scheduler):
+    scheduler = make_scheduler([{"name": "a", "difficulty": 2, "time": 1}])
+    scheduler.index_tasks()
+    assert scheduler.day_fatigue_cache(1) == pytest.approx(2 * 3)
+    scheduler.tasks[0]["difficulty"] = 3
+    scheduler.index_tasks()
+    assert scheduler.day_fatigue_cache(1) == pytest.approx(3 * 4)
@@ -0,0 +1,28 @@
+# test_day_partition.py
+# method="dp" (Scheduler.solve_day_partition) against the exact backtracking search.
+import pytest
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_dp_matches_backtrack(make_scheduler, random_tasks, seed):
+    tasks = random_tasks(seed, 5, fixed=seed % 3)
+    backtrack = make_scheduler(tasks)
+    backtrack.minimize_total_fatigue()
+    dp = make_scheduler(tasks)
+    dp.minimize_total_fatigue(method="dp")
+
+    assert dp.search_stats["method"] == "dp"
+    assert dp.min_fatigue == pytest.approx(backtrack.min_fatigue)
+    dp.load_placements()
+    assert dp.calculate_fatigue() == pytest.approx(dp.min_fatigue)
+
+
+def test_dp_falls_back_with_repeated_names(make_scheduler, random_tasks):
+    tasks = random_tasks(1, 4, num_names=2)
+    backtrack = make_scheduler(tasks)
+    backtrack.minimize_total_fatigue()
+    dp = make_scheduler(tasks)
+    dp.minimize_total_fatigue(method="dp")
+
+    assert dp.search_stats["method"] == "backtrack"
+    assert dp.min_fatigue == pytest.approx(backtrack.min_fatigue)
@@ -0,0 +1,33 @@
+# test_large_neighborhood_search.py
+# Scheduler.large_neighborhood_search against its greedy start and the exact optimum.
+import pytest
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_lns_between_optimum_and_greedy(make_scheduler, random_tasks, seed):
+    tasks = random_tasks(seed, 6, num_names=5 if seed % 2 else None, fixed=1)
+    exact = make_scheduler(tasks)
+    exact.minimize_total_fatigue()
+    lns = make_scheduler(tasks)
+    _, fatigue, _ = lns.large_neighborhood_search(iterations=30, seed=seed)
+
+    assert exact.min_fatigue - 1e-6 <= fatigue <= lns.search_stats["greedy_fatigue"] + 1e-6
+    lns.load_placements()
+    assert lns.calculate_fatigue() == pytest.approx(fatigue)
+
+
+def test_lns_improves_a_larger_week(make_scheduler, random_tasks):
+    tasks = random_tasks(3, 30, fixed=3)
+    lns = make_scheduler(tasks, end_time=17)
+    _, fatigue, _ = lns.large_neighborhood_search(iterations=60, seed=1)
+
+    assert fatigue < lns.search_stats["greedy_fatigue"]
+    assert lns.search_stats["improvements"] > 0
+    lns.load_placements()
+    assert lns.calculate_fatigue() == pytest.approx(fatigue)
+    for task_id, fixed_position in enumerate(lns.task_table.fixed):
+        if fixed_position is not None:
+            day_index, start_slot = fixed_position
+            assert lns.task_start[task_id] == day_index * lns.num_intervals_per_day + start_slot
+    again = make_scheduler(tasks, end_time=17).large_neighborhood_search(iterations=60, seed=1)
+    assert again[1] == fatigue
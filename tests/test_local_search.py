@@ -0,0 +1,29 @@
+# test_local_search.py
+# Scheduler.local_search (simulated annealing and tabu search) against greedy and the exact optimum.
+import pytest
+
+
+@pytest.mark.parametrize("strategy", ["anneal", "tabu"])
+@pytest.mark.parametrize("seed", range(4))
+def test_local_search_between_optimum_and_greedy(make_scheduler, random_tasks, strategy, seed):
+    tasks = random_tasks(seed, 6, num_names=5 if seed % 2 else None, fixed=1)
+    exact = make_scheduler(tasks)
+    exact.minimize_total_fatigue()
+    local = make_scheduler(tasks)
+    _, fatigue, _ = local.local_search(strategy, iterations=500, seed=seed)
+
+    assert exact.min_fatigue - 1e-6 <= fatigue <= local.search_stats["greedy_fatigue"] + 1e-6
+    local.load_placements()
+    assert local.calculate_fatigue() == pytest.approx(fatigue)
+    fixed_id = local.task_table.id_of(local.tasks[0])
+    day_index, start_slot = local.task_table.fixed[fixed_id]
+    assert (local.task_day[fixed_id], local.task_start[fixed_id]) == \
+        (day_index, day_index * local.num_intervals_per_day + start_slot)
+
+
+@pytest.mark.parametrize("strategy", ["anneal", "tabu"])
+def test_local_search_is_reproducible(make_scheduler, random_tasks, strategy):
+    tasks = random_tasks(7, 10)
+    first = make_scheduler(tasks, end_time=13).local_search(strategy, iterations=300, seed=3)
+    second = make_scheduler(tasks, end_time=13).local_search(strategy, iterations=300, seed=3)
+    assert first == second
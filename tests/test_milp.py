@@ -0,0 +1,67 @@
+# test_milp.py
+# method="milp" (Scheduler.solve_milp) against the exact backtracking search, on each optional backend.
+import pytest
+
+import milp_backends
+
+BACKEND_MODULES = {"ortools": "ortools.sat.python.cp_model", "pulp": "pulp"}
+
+
+@pytest.fixture(params=sorted(BACKEND_MODULES))
+def only_backend(request, monkeypatch):
+    """
+    Name of an installed backend, made the only one method="milp" can pick.
+    """
+    pytest.importorskip(BACKEND_MODULES[request.param])
+    monkeypatch.setattr(milp_backends, "BACKENDS", {request.param: milp_backends.BACKENDS[request.param]})
+    return request.param
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_milp_matches_backtrack(make_scheduler, random_tasks, only_backend, seed):
+    tasks = random_tasks(seed, 4, fixed=seed % 2)
+    if seed % 2:
+        tasks.append(dict(tasks[-1]))  # a repeated name (same attributes, or the model does not apply)
+    if seed == 2:
+        tasks[-1]["dependencies"] = [tasks[0]["name"]]
+    backtrack = make_scheduler(tasks, end_time=11)
+    backtrack.minimize_total_fatigue()
+    milp = make_scheduler(tasks, end_time=11)
+    milp.minimize_total_fatigue(method="milp")
+
+    assert milp.search_stats["method"] == "milp"
+    assert milp.search_stats["milp_backend"] == only_backend
+    assert milp.search_stats["milp_status"] == "optimal"
+    assert milp.min_fatigue == pytest.approx(backtrack.min_fatigue)
+    milp.load_placements()
+    assert milp.calculate_fatigue() == pytest.approx(milp.min_fatigue)
+
+
+def test_milp_falls_back_without_backends(make_scheduler, random_tasks, monkeypatch):
+    monkeypatch.setattr(milp_backends, "BACKENDS", {name: (model_class, None)
+                                                    for name, (model_class, _) in milp_backends.BACKENDS.items()})
+    assert milp_backends.available_backends() == []
+    assert milp_backends.create_model() is None
+    assert milp_backends.create_model("pulp") is None
+
+    tasks = random_tasks(5, 4)
+    backtrack = make_scheduler(tasks)
+    backtrack.minimize_total_fatigue()
+    fallback = make_scheduler(tasks)
+    fallback.minimize_total_fatigue(method="milp")
+    assert fallback.search_stats["method"] == "dp"
+    assert fallback.min_fatigue == pytest.approx(backtrack.min_fatigue)
+
+
+def test_milp_falls_back_when_same_name_tasks_differ(make_scheduler):
+    tasks = [{"name": "meeting", "difficulty": 4, "time": 1.5, "fixed_time": ("Wednesday", 9, 0)},
+             {"name": "meeting", "difficulty": 3, "time": 0.5, "fixed_time": ("Monday", 9, 0)}]
+    scheduler = make_scheduler(tasks)
+    scheduler.minimize_total_fatigue(method="milp")
+    assert scheduler.search_stats["method"] == "backtrack"
+    assert scheduler.min_fatigue == pytest.approx(36.0)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        milp_backends.create_model("gurobi")